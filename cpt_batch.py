@@ -0,0 +1,152 @@
+"""
+Command-line batch scoring of typed attempts, for use without the Tkinter GUI.
+
+Reads a JSONL file with one attempt per line, e.g.
+`{"id": "a1", "prompt": "Is so", "typed": "Is s"}`, scores every attempt exactly
+as an entry submitted in cpt_main.py is scored (see `TypingSession.submit()`), and
+writes one JSONL result per attempt in input order. Each result keeps the
+attempt's fields and adds the scores; a line that can't be scored gets an
+`error` field instead.
+
+Lines are streamed in chunks to a pool of worker processes, at most two chunks
+per worker in flight, so memory stays flat however large the file is.
+
+Usage:
+    python cpt_batch.py ATTEMPTS [RESULTS] [--chunk-size N] [--workers N]
+    python cpt_main.py score ATTEMPTS [RESULTS] [--chunk-size N] [--workers N]
+
+Functions:
+    main(argv): Parses command-line arguments and scores a file.
+    score_attempt(attempt): Scores of one attempt, as submitted in the GUI.
+    score_file(source, destination, chunk_size, workers): Scores a stream of JSONL attempts.
+    score_lines(lines): Scores a chunk of JSONL lines, in order.
+"""
+
+# Import Python libraries:
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Import project modules:
+from cpt_scoring import edit_distance, score_words
+
+
+def score_attempt(attempt: dict) -> dict:
+    """
+    Scores of one attempt, as submitted in the GUI.
+
+    Args:
+        attempt (dict): An attempt with "prompt" and "typed" strings.
+
+    Returns:
+        dict: The attempt's fields plus correct, words_right, words_wrong,
+            words_missing, words_extra, distance and char_errors.
+    """
+    prompt, typed = attempt["prompt"], attempt["typed"]
+    if not isinstance(prompt, str) or not isinstance(typed, str):
+        raise TypeError("'prompt' and 'typed' must be strings")
+    # The same counts as `LiveDiff.word_score()` and `char_score()`, without the alignment:
+    word_score = score_words(prompt.split(), typed.split())
+    distance = edit_distance(prompt, typed)
+    return {**attempt,
+            "correct": distance == 0,
+            **{f"words_{field}": count for field, count in word_score._asdict().items()},
+            "distance": distance,
+            "char_errors": min(distance, len(prompt))}
+
+
+def score_lines(lines) -> list:
+    """
+    Scores a chunk of JSONL lines, in order. Runs in the worker processes.
+
+    Args:
+        lines (list of tuple): (line number, line) pairs.
+
+    Returns:
+        list: One JSON-encoded result per line.
+    """
+    results = []
+    for number, line in lines:
+        try:
+            result = score_attempt(json.loads(line))
+        except (ValueError, KeyError, TypeError) as error:
+            result = {"line": number, "error": f"{type(error).__name__}: {error}"}
+        results.append(json.dumps(result, ensure_ascii=False))
+    return results
+
+
+def score_file(source, destination, chunk_size: int = 1000, workers: int = None) -> int:
+    """
+    Scores a stream of JSONL attempts across worker processes.
+
+    Args:
+        source (file): Text stream of JSONL attempts.
+        destination (file): Text stream the JSONL results are written to.
+        chunk_size (int): Lines sent to a worker at a time. Default is 1000.
+        workers (int): Number of worker processes. Default is None, one per core.
+
+    Returns:
+        int: Number of attempts written.
+    """
+    workers = workers or os.cpu_count() or 1
+    numbered = ((number, line) for number, line in enumerate(source, 1) if line.strip())
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while True:
+            # Keep every worker busy with one chunk queued behind it:
+            while len(pending) < workers * 2:
+                chunk = list(islice(numbered, chunk_size))
+                if not chunk:
+                    break
+                pending.append(executor.submit(score_lines, chunk))
+            if not pending:
+                return count
+            results = pending.popleft().result()
+            destination.write("".join(result + "\n" for result in results))
+            count += len(results)
+
+
+def main(argv=None) -> int:
+    """
+    Parses command-line arguments and scores a file.
+
+    Args:
+        argv (list of str): Arguments without the program name. Default is None, sys.argv.
+
+    Returns:
+        int: Exit status.
+    """
+    parser = argparse.ArgumentParser(description="Score JSONL typing attempts.")
+    parser.add_argument("attempts", help="JSONL file of attempts, '-' for stdin")
+    parser.add_argument("results", nargs="?", default="-",
+                        help="JSONL file to write, '-' for stdout (default)")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="lines sent to a worker at a time (default: 1000)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    arguments = parser.parse_args(argv)
+    if arguments.chunk_size < 1 or (arguments.workers is not None and arguments.workers < 1):
+        parser.error("--chunk-size and --workers must be positive")
+
+    source = sys.stdin if arguments.attempts == "-" else open(arguments.attempts, encoding="utf-8")
+    destination = (sys.stdout if arguments.results == "-"
+                   else open(arguments.results, "w", encoding="utf-8"))
+    try:
+        count = score_file(source, destination, arguments.chunk_size, arguments.workers)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if destination is not sys.stdout:
+            destination.close()
+    print(f"Scored {count} attempts.", file=sys.stderr)
+    return 0
+
+
+# Score a file from the command line:
+if __name__ == "__main__":
+    sys.exit(main())
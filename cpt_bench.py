@@ -0,0 +1,587 @@
+"""
+Reproducible benchmarks for scoring, prompt selection, startup and round reset.
+
+Standard library only. Every case is timed with `timeit`: the number of calls
+per trial is calibrated once, then several trials are taken, and each sample is
+the mean time of one call in that trial. All randomness is seeded, so every run
+does the same work.
+
+Cases:
+    score_synthetic:  scoring one entry as `TypingSession.submit()` does, on
+                      generated prompts with generated typos.
+    score_real:       the same on prompts from every tier.
+    select_<tier>:    drawing a prompt from a tier with the default sampler.
+    import_<tier>:    importing a tier's `static` module in a fresh interpreter.
+    load_<tier>:      mapping a tier's compiled blob, `cpt_corpus.load_tier()`.
+    first_prompt:     importing the app's modules, loading the first tier and
+                      drawing the first prompt in a fresh interpreter.
+    go_again_reset:   `TypingSession.reset()`, the Tk-free part of 'Go again',
+                      after a round with typos.
+    round_60s:        a headless 60-second round, keystroke by keystroke on a
+                      simulated clock, from the first key to `finish()`.
+
+Results are written as JSON, with environment metadata to compare machines by.
+
+With `--compare`, the cases of an earlier results file are run again and each is
+checked for a regression: a one-sided Mann-Whitney U test on the two sets of
+samples, and a bootstrap confidence interval of the ratio of their medians. A
+case regresses when it is significantly slower and even the low end of the
+interval exceeds its threshold; the exit status is then 1, so the run can gate
+a release. `--gate` limits the check to hot paths and sets their thresholds.
+
+Usage:
+    python cpt_bench.py [--output FILE] [--repeat N] [--case NAME ...]
+    python cpt_bench.py --compare BASELINE [--output FILE] [--threshold F] [--alpha P] [--gate PATTERN[=F] ...]
+
+Variables:
+    CASES (dict - constant): Case name to a function returning the callable to time.
+
+Functions:
+    bootstrap_ratio(baseline, current, confidence, resamples): Interval of the median ratio.
+    compare(baseline, current, gates, alpha, confidence): Regression check of every case.
+    environment(): Metadata about the machine and interpreter.
+    mann_whitney(baseline, current): One-sided p-value that current samples are slower.
+    run_case(name, repeat, min_time): Timing samples of one case.
+    run_cases(names, repeat, min_time): Timing samples of several cases.
+    summarize(samples): Median, mean, spread and extremes of timing samples.
+"""
+
+# Import Python libraries:
+import argparse
+import datetime
+import fnmatch
+import functools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from collections import Counter
+
+# Import project modules:
+from cpt_corpus import TIER_MODULES, CorpusLoader, load_tier
+from cpt_sampler import WeakWordSampler
+from cpt_scoring import LiveDiff
+from cpt_session import TypingSession
+
+_ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+_SEED = 20240101
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    """
+    Private function.
+    A copy of text with one random character dropped, doubled or replaced, or unchanged.
+    """
+    if not text or rng.random() < 0.5:
+        return text
+    i = rng.randrange(len(text))
+    edit = rng.randrange(3)
+    if edit == 0:
+        return text[:i] + text[i + 1:]
+    if edit == 1:
+        return text[:i] + text[i] + text[i:]
+    return text[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + text[i + 1:]
+
+
+def _score_case(pairs):
+    """
+    Private function.
+    Callable scoring (prompt, typed) pairs in turn, as `TypingSession.submit()` does.
+    """
+    live_diff = LiveDiff()
+    position = [0]
+
+    def score():
+        prompt, typed = pairs[position[0] % len(pairs)]
+        position[0] += 1
+        live_diff.reset(prompt)
+        live_diff.update(typed)
+        live_diff.word_score()
+        live_diff.char_score()
+
+    return score
+
+
+def _score_synthetic():
+    """
+    Private function.
+    Scoring on generated prompts of 1 to 12 words.
+    """
+    rng = random.Random(_SEED)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(1, 9)))
+             for _ in range(500)]
+    prompts = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 12))) for _ in range(1000)]
+    return _score_case([(prompt, _typo(prompt, rng)) for prompt in prompts])
+
+
+def _score_real():
+    """
+    Private function.
+    Scoring on prompts from every tier.
+    """
+    rng = random.Random(_SEED)
+    prompts = [prompt for name in TIER_MODULES for prompt in random.Random(_SEED).sample(
+        list(load_tier(name)), 250)]
+    return _score_case([(prompt, _typo(prompt, rng)) for prompt in prompts])
+
+
+def _select(tier: str):
+    """
+    Private function.
+    Drawing prompts from a tier with the default sampler.
+    """
+    corpus = CorpusLoader(first=tier)
+    sampler = WeakWordSampler(corpus, random.Random(_SEED))
+    return lambda: sampler.draw(tier)
+
+
+def _import(tier: str):
+    """
+    Private function.
+    Importing a tier's `static` module in a fresh interpreter; one call is one process.
+    """
+    code = ("import importlib, time; start = time.perf_counter(); "
+            f"importlib.import_module({TIER_MODULES[tier]!r}); "
+            "print(time.perf_counter() - start)")
+
+    def import_tier():
+        # Only the import itself is timed, not the interpreter's startup:
+        output = subprocess.run([sys.executable, "-c", code], cwd=_ROOT_DIR, check=True,
+                                capture_output=True, text=True).stdout
+        return float(output)
+
+    import_tier.measures_itself = True
+    return import_tier
+
+
+def _load(tier: str):
+    """
+    Private function.
+    Mapping a tier's compiled blob.
+    """
+    def load():
+        prompts = load_tier(tier)
+        if hasattr(prompts, "close"):
+            prompts.close()
+
+    return load
+
+
+def _first_prompt():
+    """
+    Private function.
+    Time to the first prompt in a fresh interpreter, as at startup; one call is one process.
+    """
+    code = ("import time; start = time.perf_counter(); "
+            "from cpt_corpus import CorpusLoader; from cpt_session import TypingSession; "
+            "TypingSession(CorpusLoader()).current_prompt; "
+            "print(time.perf_counter() - start)")
+
+    def first_prompt():
+        output = subprocess.run([sys.executable, "-c", code], cwd=_ROOT_DIR, check=True,
+                                capture_output=True, text=True).stdout
+        return float(output)
+
+    first_prompt.measures_itself = True
+    return first_prompt
+
+
+class _SimulatedClock:
+    """
+    Private class.
+    Clock advanced by hand, for sessions that run as fast as the CPU allows.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _play_round(corpus, entries: list = None) -> TypingSession:
+    """
+    Private function.
+    Plays a seeded 60-second round at 200 characters per minute with occasional typos.
+    Appends (prompt words, typed words) of every submitted entry to entries, if given.
+    """
+    rng = random.Random(_SEED)
+    clock = _SimulatedClock()
+    session = TypingSession(corpus, 60, clock=clock,
+                            sampler=WeakWordSampler(corpus, random.Random(_SEED)))
+    while True:
+        typed = _typo(session.current_prompt.text, rng)
+        for end in range(1, len(typed) + 1):
+            session.keylog.record(ord(typed[end - 1]))
+            session.update_typed(typed[:end])
+            clock.now += 0.3
+            # Like the GUI, an entry still being typed at zero isn't scored:
+            if session.is_over():
+                session.finish()
+                return session
+        if entries is not None:
+            entries.append((session.live_diff.prompt_words, typed.split()))
+        session.submit(typed)
+        session.next_prompt()
+
+
+def _go_again_reset():
+    """
+    Private function.
+    `TypingSession.reset()` right after a round with typos, so the misses are handed over.
+    Only the resets are timed; the sampler's worker is waited for between them.
+    """
+    corpus = CorpusLoader()
+    corpus.prefetch()
+    entries = []
+    session = _play_round(corpus, entries)
+
+    def reset(resets=100):
+        elapsed = 0.0
+        for _ in range(resets):
+            for prompt_words, typed_words in entries:
+                session.sampler.record(prompt_words, typed_words)
+            start = time.perf_counter()
+            session.reset()
+            elapsed += time.perf_counter() - start
+            session.sampler.join()
+        return elapsed / resets
+
+    reset.measures_itself = True
+    return reset
+
+
+def _round_60s():
+    """
+    Private function.
+    A headless 60-second round typed at 200 characters per minute with occasional typos.
+    """
+    corpus = CorpusLoader()
+    corpus.prefetch()
+    return lambda: _play_round(corpus)
+
+
+# Case name to a function returning the callable to time:
+CASES = {"score_synthetic": _score_synthetic,
+         "score_real": _score_real,
+         **{f"select_{tier}": (lambda tier=tier: _select(tier)) for tier in TIER_MODULES},
+         **{f"import_{tier}": (lambda tier=tier: _import(tier)) for tier in TIER_MODULES},
+         **{f"load_{tier}": (lambda tier=tier: _load(tier)) for tier in TIER_MODULES},
+         "first_prompt": _first_prompt,
+         "go_again_reset": _go_again_reset,
+         "round_60s": _round_60s}
+
+
+def run_case(name: str, repeat: int = 7, min_time: float = 0.2) -> dict:
+    """
+    Timing samples of one case.
+
+    Args:
+        name (str): A key of CASES.
+        repeat (int): Number of trials. Default is 7.
+        min_time (float): Least seconds a trial should last. Default is 0.2.
+
+    Returns:
+        dict: "number" of calls per trial and "samples", seconds per call.
+    """
+    function = CASES[name]()
+    if getattr(function, "measures_itself", False):
+        return {"number": 1, "samples": [function() for _ in range(repeat)]}
+
+    # Calibrate the calls per trial so a trial lasts at least min_time:
+    timer = timeit.Timer(function)
+    number = 1
+    while number < 10 ** 7:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * 1.2 * min_time / max(elapsed, 1e-9)))
+    return {"number": number,
+            "samples": [total / number for total in timer.repeat(repeat, number)]}
+
+
+def summarize(samples) -> dict:
+    """
+    Median, mean, spread and extremes of timing samples.
+
+    Args:
+        samples (list of float): Seconds per call.
+
+    Returns:
+        dict: "median", "mean", "stdev", "min" and "max", in seconds.
+    """
+    return {"median": statistics.median(samples),
+            "mean": statistics.fmean(samples),
+            "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            "min": min(samples),
+            "max": max(samples)}
+
+
+def run_cases(names=None, repeat: int = 7, min_time: float = 0.2) -> dict:
+    """
+    Timing samples and summaries of several cases.
+
+    Args:
+        names (list of str): Keys of CASES. Default is None, every case.
+        repeat (int): Trials per case. Default is 7.
+        min_time (float): Least seconds a trial should last. Default is 0.2.
+
+    Returns:
+        dict: Case name to its samples and summary.
+    """
+    results = {}
+    for name in names or CASES:
+        result = run_case(name, repeat, min_time)
+        result.update(summarize(result["samples"]))
+        results[name] = result
+    return results
+
+
+def environment() -> dict:
+    """
+    Metadata about the machine and interpreter.
+
+    Returns:
+        dict: Time, Python, platform, CPU and the checked-out git commit, if any.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=_ROOT_DIR, check=True,
+                                capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "commit": commit}
+
+
+@functools.lru_cache(maxsize=None)
+def _u_counts(m: int, n: int) -> tuple:
+    """
+    Private function.
+    Number of orderings of m and n tie-free samples giving each U from 0 to m * n.
+    """
+    if m == 0 or n == 0:
+        return (1,)
+    # The largest value is from the first sample, beating all n others, or from the second:
+    with_first, with_second = _u_counts(m - 1, n), _u_counts(m, n - 1)
+    return tuple((with_first[u - n] if 0 <= u - n < len(with_first) else 0)
+                 + (with_second[u] if u < len(with_second) else 0)
+                 for u in range(m * n + 1))
+
+
+def mann_whitney(baseline, current) -> float:
+    """
+    One-sided Mann-Whitney U test that current samples tend to be larger, i.e. slower.
+
+    Exact for small tie-free samples, else the normal approximation with tie and
+    continuity corrections.
+
+    Args:
+        baseline (list of float): Samples of the reference run.
+        current (list of float): Samples of the run under test.
+
+    Returns:
+        float: p-value; small values mean current is significantly slower.
+    """
+    m, n = len(current), len(baseline)
+    u = sum(1.0 if c > b else 0.5 if c == b else 0.0 for c in current for b in baseline)
+    tie_sizes = Counter(current + baseline).values()
+    if max(tie_sizes) == 1 and m * n <= 400:
+        counts = _u_counts(m, n)
+        return sum(counts[int(u):]) / sum(counts)
+
+    total = m + n
+    variance = m * n / 12 * ((total + 1) - sum(t ** 3 - t for t in tie_sizes)
+                             / (total * (total - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - m * n / 2 - 0.5) / variance ** 0.5
+    return 1.0 - statistics.NormalDist().cdf(z)
+
+
+def bootstrap_ratio(baseline, current, confidence: float = 0.95,
+                    resamples: int = 2000) -> tuple:
+    """
+    Bootstrap confidence interval of the ratio of current to baseline medians.
+
+    Resampling is seeded, so the same samples always give the same interval.
+
+    Args:
+        baseline (list of float): Samples of the reference run.
+        current (list of float): Samples of the run under test.
+        confidence (float): Coverage of the interval. Default is 0.95.
+        resamples (int): Bootstrap resamples. Default is 2000.
+
+    Returns:
+        tuple: (low, high) ratios; above 1 means current is slower.
+    """
+    rng = random.Random(_SEED)
+    ratios = sorted(statistics.median(rng.choices(current, k=len(current)))
+                    / statistics.median(rng.choices(baseline, k=len(baseline)))
+                    for _ in range(resamples))
+    tail = (1 - confidence) / 2
+    return (ratios[int(tail * resamples)],
+            ratios[min(resamples - 1, int((1 - tail) * resamples))])
+
+
+def compare(baseline: dict, current: dict, gates: dict, alpha: float = 0.01,
+            confidence: float = 0.95) -> dict:
+    """
+    Regression check of every case run both times.
+
+    A gated case regresses when the Mann-Whitney p-value is below alpha and the
+    low end of the bootstrap interval exceeds 1 plus the case's threshold, so
+    noise alone or a significant but negligible slowdown don't fail the check.
+
+    Args:
+        baseline (dict): Case name to results, the "cases" of an earlier run.
+        current (dict): Case name to results of this run.
+        gates (dict): Case name pattern, as for `fnmatch`, to its threshold, a
+            tolerated relative slowdown, e.g. 0.1. Cases matching no pattern are
+            reported but never regress; the first matching pattern applies.
+        alpha (float): Significance level of the test. Default is 0.01.
+        confidence (float): Coverage of the ratio interval. Default is 0.95.
+
+    Returns:
+        dict: Case name to "baseline" and "current" medians, "ratio" of them,
+            "interval", "p_value", "threshold" (None if not gated) and "regression".
+    """
+    results = {}
+    for name in current:
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["samples"], current[name]["samples"]
+        threshold = next((limit for pattern, limit in gates.items()
+                          if fnmatch.fnmatchcase(name, pattern)), None)
+        p_value = mann_whitney(before, after)
+        interval = bootstrap_ratio(before, after, confidence)
+        results[name] = {"baseline": statistics.median(before),
+                         "current": statistics.median(after),
+                         "ratio": statistics.median(after) / statistics.median(before),
+                         "interval": interval,
+                         "p_value": p_value,
+                         "threshold": threshold,
+                         "regression": (threshold is not None and p_value < alpha
+                                        and interval[0] > 1 + threshold)}
+    return results
+
+
+def _gate(text: str) -> tuple:
+    """
+    Private function.
+    Parses a --gate argument, "PATTERN" or "PATTERN=THRESHOLD".
+    """
+    pattern, _, threshold = text.partition("=")
+    try:
+        return pattern, float(threshold) if threshold else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid threshold in {text!r}") from None
+
+
+def _parser() -> argparse.ArgumentParser:
+    """
+    Private function.
+    Command-line arguments of the benchmark runner.
+    """
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--output",
+                        help="JSON file to write (default: bench_results.json, or "
+                             "bench_compare.json with --compare)")
+    parser.add_argument("--repeat", type=int, default=7, help="trials per case (default: 7)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="least seconds per trial (default: 0.2)")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), dest="cases",
+                        help="case to run, repeatable (default: all, or the baseline's)")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="results file to check this run against; exits 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="tolerated relative slowdown (default: 0.1)")
+    parser.add_argument("--alpha", type=float, default=0.01,
+                        help="significance level of the test (default: 0.01)")
+    parser.add_argument("--confidence", type=float, default=0.95,
+                        help="coverage of the median ratio interval (default: 0.95)")
+    parser.add_argument("--gate", action="append", type=_gate, dest="gates",
+                        metavar="PATTERN[=THRESHOLD]",
+                        help="cases that can fail the comparison, repeatable "
+                             "(default: all, at --threshold)")
+    return parser
+
+
+def main(argv=None) -> int:
+    """
+    Runs the benchmarks and writes their results.
+
+    Args:
+        argv (list of str): Arguments without the program name. Default is None, sys.argv.
+
+    Returns:
+        int: Exit status.
+    """
+    parser = _parser()
+    arguments = parser.parse_args(argv)
+    if arguments.output is None:
+        arguments.output = "bench_compare.json" if arguments.compare else "bench_results.json"
+    # Writing the report over the baseline would lose the baseline:
+    if arguments.compare and os.path.realpath(arguments.output) == os.path.realpath(
+            arguments.compare):
+        parser.error("--output must not be the --compare baseline")
+    names = arguments.cases
+    machine = environment()
+    if arguments.compare:
+        with open(arguments.compare, encoding="utf-8") as source:
+            baseline = json.load(source)
+        names = names or [name for name in baseline["cases"] if name in CASES]
+        # Timings from another machine or interpreter aren't comparable:
+        for key in ("python", "implementation", "machine", "processor", "cpu_count"):
+            if baseline["environment"].get(key) != machine[key]:
+                print(f"warning: baseline {key} differs: {baseline['environment'].get(key)!r} "
+                      f"vs {machine[key]!r}", file=sys.stderr)
+
+    report = {"environment": machine,
+              "repeat": arguments.repeat,
+              "cases": run_cases(names, arguments.repeat, arguments.min_time)}
+    if not arguments.compare:
+        with open(arguments.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        for name, result in report["cases"].items():
+            print(f"{name:<28} {result['median'] * 1e6:>12.1f} us  "
+                  f"(+/- {result['stdev'] * 1e6:.1f})")
+        return 0
+
+    gates = {pattern: arguments.threshold if threshold is None else threshold
+             for pattern, threshold in arguments.gates or [("*", None)]}
+    comparison = compare(baseline["cases"], report["cases"], gates, arguments.alpha,
+                         arguments.confidence)
+    report["comparison"] = {"baseline": arguments.compare,
+                            "baseline_commit": baseline["environment"].get("commit"),
+                            "alpha": arguments.alpha,
+                            "confidence": arguments.confidence,
+                            "cases": comparison}
+    with open(arguments.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+    for name, result in comparison.items():
+        limit = "-" if result["threshold"] is None else f"+{result['threshold']:.0%}"
+        print(f"{name:<28} {result['baseline'] * 1e6:>12.1f} -> {result['current'] * 1e6:>12.1f} us"
+              f"  x{result['ratio']:.3f} [{result['interval'][0]:.3f}, {result['interval'][1]:.3f}]"
+              f"  p={result['p_value']:.4f}  {limit:>5}"
+              f"{'  REGRESSION' if result['regression'] else ''}")
+    regressions = [name for name, result in comparison.items() if result["regression"]]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+# Run the benchmarks from the command line:
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""
+Compiled, memory-mapped word banks for use in the Tkinter GUI via cpt_main.py.
+
+Each tier in the `static` directory (`long_sentences`, `short_sentences`,
+`words_two`, `words_one`) is packed into a single `.cptc` blob: a small header,
+an array of byte offsets, then one UTF-8 string table. The blob is `mmap`-ed at
+startup and prompts are only decoded when they are picked, so cold start time and
+resident memory no longer grow with the size of the Python list literals.
+
+Run `python cpt_corpus.py` to (re)build every blob. Blobs are also rebuilt
+automatically whenever their source module is newer.
+
+Variables:
+    CORPUS_SUFFIX (str - constant): File extension of compiled tier blobs.
+    STATIC_DIR (str - constant): Directory holding the source modules and blobs.
+    TIER_MODULES (dict - constant): Tier name to source module name.
+
+Classes:
+    CorpusLoader: Loads the first tier eagerly and prefetches the rest on a thread.
+    TierCorpus: Read-only sequence of prompts backed by a memory-mapped blob.
+
+Functions:
+    blob_path(name): Path of the compiled blob for a tier.
+    build_tier(name): Compiles a tier's source module into its blob.
+    load_tier(name): Returns a tier as a `TierCorpus`, or a plain list as fallback.
+    tier_for_seconds(seconds): Name of the tier used at a remaining second count.
+    write_corpus(path, prompts): Packs an iterable of prompts into a blob.
+"""
+
+# Import Python libraries:
+import importlib
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections.abc import Sequence
+
+# Import data from `static` directory:
+from static.cpt_config import TIER_THRESHOLDS
+
+# Location of word banks:
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+CORPUS_SUFFIX = ".cptc"
+
+# Tier name to the module defining a list of the same name:
+TIER_MODULES = {"long_sentences": "static.cpt_long_sentences",
+                "short_sentences": "static.cpt_short_sentences",
+                "words_two": "static.cpt_words_two",
+                "words_one": "static.cpt_words_one"}
+
+# Blob header: magic, format version, offset item size, prompt count, reserved.
+# Native byte order is used throughout so the offset array can be cast in place;
+# a blob built on a machine of the other endianness fails the version check and
+# is simply rebuilt.
+_MAGIC = b"CPTC"
+_VERSION = 1
+_HEADER = struct.Struct("=4sHHII")
+_OFFSET_TYPE = "I"
+
+
+def blob_path(name: str, directory: str = STATIC_DIR) -> str:
+    """
+    Path of the compiled blob for a tier.
+
+    Args:
+        name (str): Tier name, a key of TIER_MODULES.
+        directory (str): Directory holding the blobs. Default is STATIC_DIR.
+
+    Returns:
+        str: Path of the `.cptc` file.
+    """
+    return os.path.join(directory, f"{name}{CORPUS_SUFFIX}")
+
+
+def _source_path(name: str) -> str:
+    """
+    Private function.
+    Path of the Python module a tier is compiled from.
+    """
+    return os.path.join(STATIC_DIR, f"cpt_{name}.py")
+
+
+def _import_tier(name: str) -> list:
+    """
+    Private function.
+    Imports a tier's list literal from its source module.
+    """
+    return getattr(importlib.import_module(TIER_MODULES[name]), name)
+
+
+def write_corpus(path: str, prompts) -> int:
+    """
+    Packs an iterable of prompts into a blob.
+
+    The blob is written to a temporary file first and moved into place, so a
+    reader never sees a half-written corpus.
+
+    Args:
+        path (str): Destination `.cptc` path.
+        prompts (iterable of str): Prompts in the order they should be stored.
+
+    Returns:
+        int: Number of prompts written.
+
+    Raises:
+        ValueError: If the string table outgrows the offset type.
+    """
+    offsets = array(_OFFSET_TYPE, [0])
+    table = bytearray()
+    for prompt in prompts:
+        table += prompt.encode("utf-8")
+        # Checked before appending, as the array itself would raise OverflowError:
+        if len(table) >= 1 << (8 * offsets.itemsize):
+            raise ValueError(f"Corpus too large for {path}.")
+        offsets.append(len(table))
+
+    count = len(offsets) - 1
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as blob:
+        blob.write(_HEADER.pack(_MAGIC, _VERSION, offsets.itemsize, count, 0))
+        offsets.tofile(blob)
+        blob.write(table)
+    os.replace(temp_path, path)
+    return count
+
+
+def build_tier(name: str, directory: str = STATIC_DIR) -> int:
+    """
+    Compiles a tier's source module into its blob.
+
+    Args:
+        name (str): Tier name, a key of TIER_MODULES.
+        directory (str): Directory to write the blob to. Default is STATIC_DIR.
+
+    Returns:
+        int: Number of prompts written.
+    """
+    return write_corpus(blob_path(name, directory), _import_tier(name))
+
+
+class TierCorpus(Sequence):
+    """
+    Read-only sequence of prompts backed by a memory-mapped blob.
+
+    Indexing decodes a single prompt from the mapped string table, so
+    `random.choice(corpus)` touches only the bytes of the prompt it returns.
+
+    Attributes:
+        path (str): Path of the mapped `.cptc` file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize `TierCorpus()` object.
+
+        Args:
+            path (str): Path of a blob written by `write_corpus()`.
+
+        Raises:
+            ValueError: If the file is not a blob of the current format.
+        """
+        self.path = path
+        with open(path, "rb") as blob:
+            self._mmap = mmap.mmap(blob.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, itemsize, count, _ = _HEADER.unpack_from(self._mmap)
+        if (magic, version, itemsize) != (_MAGIC, _VERSION, array(_OFFSET_TYPE).itemsize):
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {_VERSION} corpus.")
+
+        # Zero-copy views over the offset array and the string table:
+        table_start = _HEADER.size + (count + 1) * itemsize
+        self._view = memoryview(self._mmap)
+        self._offsets = self._view[_HEADER.size:table_start].cast(_OFFSET_TYPE)
+        self._table = self._view[table_start:]
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("corpus index out of range")
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return str(self._table[start:end], "utf-8")
+
+    def close(self):
+        """
+        Releases the memory map. The corpus is unusable afterwards.
+        """
+        self._offsets.release()
+        self._table.release()
+        self._view.release()
+        self._mmap.close()
+
+
+def _is_stale(name: str, path: str) -> bool:
+    """
+    Private function.
+    True when a tier's blob is missing or older than its source module.
+    """
+    if not os.path.exists(path):
+        return True
+    source = _source_path(name)
+    return os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(path)
+
+
+def load_tier(name: str, directory: str = STATIC_DIR):
+    """
+    Returns a tier as a `TierCorpus`, or a plain list as fallback.
+
+    The blob is (re)built first if it is missing or stale. If it can't be built
+    or mapped (read-only install, corrupt file) the list literal is imported
+    instead, so the GUI always gets a usable sequence.
+
+    Args:
+        name (str): Tier name, a key of TIER_MODULES.
+        directory (str): Directory holding the blobs. Default is STATIC_DIR.
+
+    Returns:
+        Sequence[str]: The tier's prompts.
+    """
+    path = blob_path(name, directory)
+    try:
+        if _is_stale(name, path):
+            build_tier(name, directory)
+        return TierCorpus(path)
+    except (OSError, ValueError):
+        return _import_tier(name)
+
+
+def tier_for_seconds(seconds: int) -> str:
+    """
+    Name of the tier used at a remaining second count.
+
+    Args:
+        seconds (int): Seconds left on the countdown.
+
+    Returns:
+        str: The first tier in TIER_THRESHOLDS whose threshold `seconds` exceeds.
+    """
+    for name, threshold in TIER_THRESHOLDS.items():
+        if seconds > threshold:
+            return name
+    return name
+
+
+class CorpusLoader:
+    """
+    Loads the first tier eagerly and prefetches the rest on a thread.
+
+    Only the tier shown when the countdown starts is loaded by the constructor, so
+    time-to-first-prompt depends on one tier. `prefetch()` then loads the others
+    in TIER_THRESHOLDS order on a daemon thread, each well before the countdown
+    reaches it. `get()` blocks only if a tier is asked for before it has arrived.
+
+    Attributes:
+        first (str): Name of the tier loaded by the constructor.
+    """
+
+    def __init__(self, first: str = "long_sentences", loader=load_tier):
+        """
+        Initialize `CorpusLoader()` object.
+
+        Args:
+            first (str): Tier to load immediately. Default is "long_sentences".
+            loader (callable): Tier name to sequence. Default is `load_tier`.
+        """
+        self.first = first
+        self._loader = loader
+        self._tiers = {}
+        self._ready = {name: threading.Event() for name in TIER_THRESHOLDS}
+        self._thread = None
+        self._load(first)
+
+    def _load(self, name: str):
+        """
+        Private method.
+        Loads a tier and marks it ready, even if loading raised.
+        """
+        try:
+            self._tiers[name] = self._loader(name)
+        finally:
+            self._ready[name].set()
+
+    def _prefetch_all(self):
+        """
+        Private method.
+        Thread target, loads every remaining tier in countdown order.
+        """
+        for name in TIER_THRESHOLDS:
+            if not self._ready[name].is_set():
+                self._load(name)
+
+    def prefetch(self):
+        """
+        Starts loading the remaining tiers on a background thread. Idempotent.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._prefetch_all,
+                                            name="cpt-corpus-prefetch",
+                                            daemon=True)
+            self._thread.start()
+
+    def is_ready(self, name: str) -> bool:
+        """
+        True once a tier has finished loading.
+        """
+        return self._ready[name].is_set()
+
+    def get(self, name: str):
+        """
+        Returns a tier, waiting for the prefetch thread if it's still loading.
+
+        Args:
+            name (str): Tier name, a key of TIER_THRESHOLDS.
+
+        Returns:
+            Sequence[str]: The tier's prompts.
+        """
+        if name not in self._tiers:
+            if self._thread is None:
+                self._load(name)
+            else:
+                self._ready[name].wait()
+            # The prefetch thread failed on this tier, retry on the caller's thread:
+            if name not in self._tiers:
+                self._tiers[name] = self._loader(name)
+        return self._tiers[name]
+
+
+# Build every blob from the `static` modules:
+if __name__ == "__main__":
+    for tier_name in TIER_MODULES:
+        print(f"{tier_name}: {build_tier(tier_name)} prompts -> {blob_path(tier_name)}")
@@ -0,0 +1,86 @@
+"""
+Drift-free countdown scheduling for use in the Tkinter GUI via cpt_main.py.
+
+Chaining `root.after(1000, ...)` and counting callbacks lets every late callback
+stretch the test. `Countdown` instead reads the time left from a monotonic
+deadline on every tick and schedules the next tick for the next interval
+boundary before that deadline, so a stalled event loop only skips ticks and the
+last tick lands on the deadline itself.
+
+Classes:
+    Countdown: Ticks a callback on interval boundaries counted back from a deadline.
+"""
+
+# Import Python libraries:
+import math
+
+
+class Countdown:
+    """
+    Ticks a callback on interval boundaries counted back from a deadline.
+
+    With the default one-second interval the ticks fall exactly where the
+    displayed whole seconds change; a shorter interval ticks more often, e.g. for
+    a tenths display.
+
+    Attributes:
+        callback (callable): Called with no arguments on every tick, last at the deadline.
+        interval_ms (int): Milliseconds between ticks.
+        remaining (callable): Returns the seconds left until the deadline.
+        root (Tk): Tkinter window whose `after()` schedules the ticks.
+    """
+
+    def __init__(self, root, remaining, callback, interval_ms: int = 1000):
+        """
+        Initialize `Countdown()` object.
+
+        Args:
+            root (Tk): Tkinter window whose `after()` schedules the ticks.
+            remaining (callable): Returns the seconds left, e.g. `TypingSession.remaining`.
+            callback (callable): Called on every tick.
+            interval_ms (int): Milliseconds between ticks. Default is 1000.
+        """
+        self.root = root
+        self.remaining = remaining
+        self.callback = callback
+        self.interval_ms = interval_ms
+        self._after_id = None
+
+    @property
+    def running(self) -> bool:
+        """
+        True while a tick is scheduled.
+        """
+        return self._after_id is not None
+
+    def start(self):
+        """
+        Ticks immediately and keeps ticking until the deadline.
+        """
+        self.cancel()
+        self._tick()
+
+    def cancel(self):
+        """
+        Cancels the scheduled tick, if any.
+        """
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        """
+        Private method.
+        Schedules the next tick, then runs the callback.
+
+        The next tick is scheduled first so the callback can cancel it. The wait
+        is rounded up to whole milliseconds, so a tick never lands before its
+        boundary; one that fires late simply aims for the following boundary.
+        """
+        self._after_id = None
+        left = self.remaining()
+        if left > 0:
+            step = self.interval_ms / 1000
+            wait = left % step or step
+            self._after_id = self.root.after(max(1, math.ceil(wait * 1000)), self._tick)
+        self.callback()
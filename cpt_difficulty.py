@@ -0,0 +1,369 @@
+"""
+Precomputed per-prompt difficulty index for the word banks of cpt_corpus.py.
+
+Every prompt of every tier is scored offline on five features:
+
+    - length: characters in the prompt.
+    - rare_bigrams: letter pairs outside the bigrams that make up 90% of all the
+      word banks' letter pairs.
+    - capitals: upper-case letters, each needing 'Shift'.
+    - punctuation: characters that are neither letters, digits nor spaces.
+    - alternation: per-mille share of consecutive keys typed by alternate hands
+      on a QWERTY keyboard; alternating hands is faster than same-hand runs.
+
+A tier's index is stored next to its `.cptc` blob as a `.cptd` file of columns
+sorted by difficulty: the prompt indices, their difficulty scores, then one column
+per feature. The file is `mmap`-ed and read through typed memoryviews, so the
+prompts within a difficulty band are found with two bisects on the score column
+instead of a scan.
+
+Run `python cpt_difficulty.py` to (re)build every index. `load_index()` also
+rebuilds an index whose tier's blob is newer; nothing else rebuilds them.
+
+Variables:
+    DIFFICULTY_SUFFIX (str - constant): File extension of difficulty indexes.
+    FEATURES (tuple - constant): Names of the feature columns, in order.
+
+Classes:
+    DifficultyIndex: Tier prompts sorted by difficulty, with their features.
+
+Functions:
+    build_index(name, rare): Computes and writes a tier's difficulty index.
+    index_path(name): Path of the difficulty index of a tier.
+    load_index(name): Returns a tier's difficulty index, rebuilt if it is stale.
+    prompt_features(prompt, rare): Feature values of one prompt.
+    rare_bigrams(tiers): Letter pairs outside the most common 90% of the word banks.
+"""
+
+# Import Python libraries:
+import bisect
+import mmap
+import os
+import random
+import struct
+from array import array
+from collections import Counter
+
+# Import project modules:
+from cpt_corpus import STATIC_DIR, TIER_MODULES, blob_path, load_tier
+
+DIFFICULTY_SUFFIX = ".cptd"
+
+# Feature columns, in file order:
+FEATURES = ("length", "rare_bigrams", "capitals", "punctuation", "alternation")
+
+# Difficulty added per unit of each feature, and per same-hand pair of keys:
+_WEIGHTS = {"length": 1.0, "rare_bigrams": 3.0, "capitals": 2.0, "punctuation": 2.0}
+_SAME_HAND_WEIGHT = 0.5
+
+# Share of all letter pairs covered by the common bigrams:
+_COMMON_SHARE = 0.9
+
+# Keys typed by the left hand on QWERTY; every other key counts as right-handed:
+_LEFT_HAND = frozenset("`12345qwertasdfgzxcvb~!@#$%QWERTASDFGZXCVB")
+
+# Index header: magic, format version, feature count, prompt count, reserved.
+_MAGIC = b"CPTD"
+_VERSION = 1
+_HEADER = struct.Struct("=4sHHII")
+_ORDER_TYPE = "I"
+_SCORE_TYPE = "f"
+_FEATURE_TYPE = "H"
+_FEATURE_MAX = (1 << 16) - 1
+
+# Rare bigrams of the word banks, keyed by directory and the blobs' modification times:
+_rare_cache = {}
+
+
+def index_path(name: str, directory: str = STATIC_DIR) -> str:
+    """
+    Path of the difficulty index of a tier.
+
+    Args:
+        name (str): Tier name, a key of TIER_MODULES.
+        directory (str): Directory holding the indexes. Default is STATIC_DIR.
+
+    Returns:
+        str: Path of the `.cptd` file.
+    """
+    return os.path.join(directory, f"{name}{DIFFICULTY_SUFFIX}")
+
+
+def _bigrams(prompt: str):
+    """
+    Private function.
+    Lower-case letter pairs of a prompt, within words.
+    """
+    for word in prompt.lower().split():
+        for first, second in zip(word, word[1:]):
+            if first.isalpha() and second.isalpha():
+                yield first + second
+
+
+def rare_bigrams(tiers) -> frozenset:
+    """
+    Letter pairs outside the most common 90% of the word banks.
+
+    Args:
+        tiers (iterable): Sequences of prompts, e.g. every tier.
+
+    Returns:
+        frozenset: The rare bigrams.
+    """
+    counts = Counter(pair for prompts in tiers for prompt in prompts for pair in _bigrams(prompt))
+    covered, common = 0, set()
+    for pair, count in counts.most_common():
+        if covered >= _COMMON_SHARE * sum(counts.values()):
+            break
+        common.add(pair)
+        covered += count
+    return frozenset(counts.keys() - common)
+
+
+def _close(prompts):
+    """
+    Private function.
+    Releases a tier from `load_tier()`, if it is mapped rather than a plain list.
+    """
+    if hasattr(prompts, "close"):
+        prompts.close()
+
+
+def _shared_rare(directory: str) -> frozenset:
+    """
+    Private function.
+    Rare bigrams of every tier in a directory, computed once per version of the blobs.
+    """
+    tiers = [load_tier(tier, directory) for tier in TIER_MODULES]
+    try:
+        key = (directory, tuple(os.path.getmtime(blob_path(tier, directory))
+                                if os.path.exists(blob_path(tier, directory)) else None
+                                for tier in TIER_MODULES))
+        if key not in _rare_cache:
+            _rare_cache.clear()
+            _rare_cache[key] = rare_bigrams(tiers)
+        return _rare_cache[key]
+    finally:
+        for prompts in tiers:
+            _close(prompts)
+
+
+def prompt_features(prompt: str, rare: frozenset) -> dict:
+    """
+    Feature values of one prompt.
+
+    Args:
+        prompt (str): The prompt.
+        rare (frozenset): Rare bigrams from `rare_bigrams()`.
+
+    Returns:
+        dict: Name in FEATURES to value, plus "difficulty".
+    """
+    keys = prompt.replace(" ", "")
+    pairs = list(zip(keys, keys[1:]))
+    alternations = sum((first in _LEFT_HAND) != (second in _LEFT_HAND) for first, second in pairs)
+    features = {"length": len(prompt),
+                "rare_bigrams": sum(pair in rare for pair in _bigrams(prompt)),
+                "capitals": sum(char.isupper() for char in prompt),
+                "punctuation": sum(not (char.isalnum() or char.isspace()) for char in prompt),
+                "alternation": round(alternations / len(pairs) * 1000) if pairs else 1000}
+    features = {name: min(value, _FEATURE_MAX) for name, value in features.items()}
+    features["difficulty"] = (sum(weight * features[name] for name, weight in _WEIGHTS.items())
+                              + _SAME_HAND_WEIGHT * (len(pairs) - alternations))
+    return features
+
+
+def _write_index(path: str, prompts, rare: frozenset) -> int:
+    """
+    Private function.
+    Scores every prompt and writes the columns sorted by difficulty, via a temporary file.
+    """
+    rows = sorted(((prompt_features(prompt, rare), index) for index, prompt in enumerate(prompts)),
+                  key=lambda row: (row[0]["difficulty"], row[1]))
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as index:
+        index.write(_HEADER.pack(_MAGIC, _VERSION, len(FEATURES), len(rows), 0))
+        array(_ORDER_TYPE, (prompt_index for _, prompt_index in rows)).tofile(index)
+        array(_SCORE_TYPE, (features["difficulty"] for features, _ in rows)).tofile(index)
+        for name in FEATURES:
+            array(_FEATURE_TYPE, (features[name] for features, _ in rows)).tofile(index)
+    os.replace(temp_path, path)
+    return len(rows)
+
+
+def build_index(name: str, rare: frozenset = None, directory: str = STATIC_DIR) -> int:
+    """
+    Computes and writes a tier's difficulty index.
+
+    Args:
+        name (str): Tier name, a key of TIER_MODULES.
+        rare (frozenset): Rare bigrams. Default is None, computed from every tier
+            once per version of the blobs.
+        directory (str): Directory holding the blobs and indexes. Default is STATIC_DIR.
+
+    Returns:
+        int: Number of prompts indexed.
+    """
+    if rare is None:
+        rare = _shared_rare(directory)
+    prompts = load_tier(name, directory)
+    try:
+        return _write_index(index_path(name, directory), prompts, rare)
+    finally:
+        _close(prompts)
+
+
+class DifficultyIndex:
+    """
+    Tier prompts sorted by difficulty, with their features.
+
+    Position i of every column describes the i-th easiest prompt; `order[i]` is
+    its index in the tier.
+
+    Attributes:
+        difficulty (Sequence[float]): Difficulty scores, ascending.
+        order (Sequence[int]): Tier index of the prompt at each position.
+        path (str): Path of the mapped `.cptd` file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize `DifficultyIndex()` object.
+
+        Args:
+            path (str): Path of an index written by `build_index()`.
+
+        Raises:
+            ValueError: If the file is not an index of the current format.
+        """
+        self.path = path
+        with open(path, "rb") as index:
+            self._mmap = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, features, count, _ = _HEADER.unpack_from(self._mmap)
+        if (magic, version, features) != (_MAGIC, _VERSION, len(FEATURES)):
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {_VERSION} difficulty index.")
+
+        # Zero-copy views over each column:
+        self._view = memoryview(self._mmap)
+        self._columns = {}
+        start = _HEADER.size
+        for column, typecode in [("order", _ORDER_TYPE), ("difficulty", _SCORE_TYPE),
+                                 *((name, _FEATURE_TYPE) for name in FEATURES)]:
+            end = start + count * array(typecode).itemsize
+            self._columns[column] = self._view[start:end].cast(typecode)
+            start = end
+        self.order = self._columns["order"]
+        self.difficulty = self._columns["difficulty"]
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        """
+        Releases the memory map. The index is unusable afterwards.
+        """
+        for column in self._columns.values():
+            column.release()
+        self._view.release()
+        self._mmap.close()
+
+    def feature(self, name: str):
+        """
+        One feature of every prompt, in difficulty order.
+
+        Args:
+            name (str): A name from FEATURES.
+
+        Returns:
+            memoryview: The feature column.
+        """
+        return self._columns[name]
+
+    def quantile(self, fraction: float) -> float:
+        """
+        Difficulty score below which a fraction of the tier's prompts fall.
+
+        Args:
+            fraction (float): Between 0 and 1.
+
+        Returns:
+            float: The score, e.g. for a band relative to the tier.
+        """
+        return self.difficulty[min(int(fraction * self._count), self._count - 1)]
+
+    def band(self, low: float, high: float) -> range:
+        """
+        Positions of the prompts with a difficulty in [low, high], in O(log n).
+
+        Args:
+            low (float): Lowest difficulty score.
+            high (float): Highest difficulty score.
+
+        Returns:
+            range: Positions into `order` and the feature columns.
+        """
+        return range(bisect.bisect_left(self.difficulty, low),
+                     bisect.bisect_right(self.difficulty, high))
+
+    def draw_index(self, low: float, high: float, rng: random.Random = random) -> int:
+        """
+        Tier index of a random prompt with a difficulty in [low, high].
+
+        Args:
+            low (float): Lowest difficulty score.
+            high (float): Highest difficulty score.
+            rng (random.Random): Source of randomness. Default is the `random` module.
+
+        Returns:
+            int: Index into the tier.
+
+        Raises:
+            IndexError: If no prompt falls within the band.
+        """
+        positions = self.band(low, high)
+        if not positions:
+            raise IndexError(f"no prompt with a difficulty between {low} and {high}")
+        return self.order[rng.choice(positions)]
+
+
+def _is_stale(name: str, path: str, directory: str) -> bool:
+    """
+    Private function.
+    True when an index is missing or older than its tier's blob.
+    """
+    if not os.path.exists(path):
+        return True
+    blob = blob_path(name, directory)
+    return os.path.exists(blob) and os.path.getmtime(blob) > os.path.getmtime(path)
+
+
+def load_index(name: str, directory: str = STATIC_DIR) -> DifficultyIndex:
+    """
+    Returns a tier's difficulty index, rebuilt first if it is missing or stale.
+
+    Args:
+        name (str): Tier name, a key of TIER_MODULES.
+        directory (str): Directory holding the blobs and indexes. Default is STATIC_DIR.
+
+    Returns:
+        DifficultyIndex: The mapped index.
+    """
+    path = index_path(name, directory)
+    # Loading the tier first rebuilds its blob if the source module changed:
+    prompts = load_tier(name, directory)
+    try:
+        if _is_stale(name, path, directory):
+            _write_index(path, prompts, _shared_rare(directory))
+    finally:
+        _close(prompts)
+    return DifficultyIndex(path)
+
+
+# Build every index from the compiled word banks:
+if __name__ == "__main__":
+    for tier_name in TIER_MODULES:
+        print(f"{tier_name}: {build_index(tier_name)} prompts -> "
+              f"{index_path(tier_name)}")
@@ -0,0 +1,349 @@
+"""
+Persistent round history for use in the Tkinter GUI via cpt_main.py.
+
+Every finished round is stored in a local SQLite database: one `rounds` row of
+summary statistics and one `entries` row per submitted entry. The database runs
+in WAL mode so progress queries never wait on a writer, each round is written in
+a single transaction, and rounds are indexed by user and time.
+
+The GUI never touches the database itself: `HistoryWriter` hands rounds to a
+dedicated thread through a bounded queue, so a slow disk can't stall Tk. The same
+thread can also append each round to the binary analytics log of cpt_roundlog.py.
+
+Variables:
+    DEFAULT_HISTORY_PATH (str - constant): Database used when no path is given.
+
+Classes:
+    HistoryStore: SQLite store of finished rounds.
+    HistoryWriter: Background thread writing rounds to a HistoryStore.
+"""
+
+# Import Python libraries:
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Import project modules:
+from cpt_roundlog import RoundLogWriter
+
+# Database in the user's home directory:
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".check_practice_typing.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    num_entries INTEGER NOT NULL,
+    user_right INTEGER NOT NULL,
+    words_right INTEGER NOT NULL,
+    total_words INTEGER NOT NULL,
+    entry_accuracy INTEGER NOT NULL,
+    word_accuracy INTEGER NOT NULL,
+    char_accuracy INTEGER NOT NULL,
+    gross_wpm REAL NOT NULL,
+    net_wpm REAL NOT NULL,
+    cpm REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rounds_user_finished_at ON rounds (user, finished_at);
+CREATE INDEX IF NOT EXISTS rounds_finished_at ON rounds (finished_at);
+CREATE TABLE IF NOT EXISTS entries (
+    round_id INTEGER NOT NULL REFERENCES rounds (id),
+    seq INTEGER NOT NULL,
+    at REAL NOT NULL,
+    prompt TEXT NOT NULL,
+    typed TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    words_right INTEGER NOT NULL,
+    words_wrong INTEGER NOT NULL,
+    words_missing INTEGER NOT NULL,
+    words_extra INTEGER NOT NULL,
+    distance INTEGER NOT NULL,
+    PRIMARY KEY (round_id, seq)
+) WITHOUT ROWID;
+"""
+
+_INSERT_ROUND = """
+INSERT INTO rounds (user, finished_at, duration, num_entries, user_right, words_right,
+                    total_words, entry_accuracy, word_accuracy, char_accuracy,
+                    gross_wpm, net_wpm, cpm)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_ENTRY = """
+INSERT INTO entries (round_id, seq, at, prompt, typed, correct, words_right, words_wrong,
+                     words_missing, words_extra, distance)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class HistoryStore:
+    """
+    SQLite store of finished rounds.
+
+    A store, like the sqlite3 connection it wraps, belongs to the thread that
+    created it.
+
+    Attributes:
+        path (str): Path of the database file.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH):
+        """
+        Initialize `HistoryStore()` object, creating the database if needed.
+
+        Args:
+            path (str): Path of the database file. Default is DEFAULT_HISTORY_PATH.
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        self._conn.close()
+
+    @staticmethod
+    def round_rows(user: str, session, finished_at: float = None):
+        """
+        Flattens a finished session into its `rounds` row and `entries` rows.
+
+        Args:
+            user (str): Name the round is stored under.
+            session (TypingSession): Session after `finish()`, see `cpt_session.py`.
+            finished_at (float): Unix time the round ended. Default is None, now.
+
+        Returns:
+            tuple: (round row, list of entry rows without their round id).
+        """
+        stats = session.stats
+        round_row = (user, time.time() if finished_at is None else finished_at,
+                     stats.elapsed, session.num_entries, session.user_right,
+                     session.words_right, session.total_words, session.entry_accuracy,
+                     session.word_accuracy, session.char_accuracy,
+                     stats.gross_wpm, stats.net_wpm, stats.cpm)
+        entry_rows = [(seq, entry.at, entry.prompt, entry.typed, int(entry.correct),
+                       *entry.word_score, entry.char_score.distance)
+                      for seq, entry in enumerate(session.entries)]
+        return round_row, entry_rows
+
+    def save_rounds(self, rounds) -> list:
+        """
+        Writes any number of rounds in a single transaction.
+
+        Args:
+            rounds (iterable): (round row, entry rows) pairs from `round_rows()`.
+
+        Returns:
+            list: Ids of the new rounds.
+        """
+        ids = []
+        with self._conn:
+            for round_row, entry_rows in rounds:
+                round_id = self._conn.execute(_INSERT_ROUND, round_row).lastrowid
+                self._conn.executemany(_INSERT_ENTRY,
+                                       [(round_id, *row) for row in entry_rows])
+                ids.append(round_id)
+        return ids
+
+    def save_round(self, user: str, session, finished_at: float = None) -> int:
+        """
+        Writes a finished session and its entries in one transaction.
+
+        Args:
+            user (str): Name the round is stored under.
+            session (TypingSession): Session after `finish()`.
+            finished_at (float): Unix time the round ended. Default is None, now.
+
+        Returns:
+            int: Id of the new round.
+        """
+        return self.save_rounds([self.round_rows(user, session, finished_at)])[0]
+
+    def recent_rounds(self, user: str, limit: int = 10) -> list:
+        """
+        A user's latest rounds, newest first.
+
+        Args:
+            user (str): Name the rounds are stored under.
+            limit (int): Maximum number of rounds. Default is 10.
+
+        Returns:
+            list: (finished_at, duration, net_wpm, cpm, word_accuracy, entry_accuracy) rows.
+        """
+        return self._conn.execute(
+            "SELECT finished_at, duration, net_wpm, cpm, word_accuracy, entry_accuracy "
+            "FROM rounds WHERE user = ? ORDER BY finished_at DESC LIMIT ?",
+            (user, limit)).fetchall()
+
+    def progress(self, user: str, since: float = 0, bucket_seconds: int = 86400) -> list:
+        """
+        A user's average speed and accuracy per time bucket, answered from the index.
+
+        Args:
+            user (str): Name the rounds are stored under.
+            since (float): Unix time to start from. Default is 0, all history.
+            bucket_seconds (int): Bucket width in seconds. Default is 86400, one day.
+
+        Returns:
+            list: (bucket start, rounds, mean net_wpm, mean word_accuracy) rows, oldest first.
+        """
+        return self._conn.execute(
+            "SELECT CAST(finished_at / ? AS INTEGER) * ? AS bucket, COUNT(*), "
+            "AVG(net_wpm), AVG(word_accuracy) "
+            "FROM rounds WHERE user = ? AND finished_at >= ? "
+            "GROUP BY bucket ORDER BY bucket",
+            (bucket_seconds, bucket_seconds, user, since)).fetchall()
+
+
+class HistoryWriter:
+    """
+    Background thread writing rounds to a HistoryStore.
+
+    `save_round()` flattens the session on the caller's thread and queues the
+    rows. The writer thread owns the database connection; it drains whatever
+    rounds have piled up and writes them together in one transaction. When the
+    queue is full, callers wait up to their timeout, then the round is dropped
+    rather than freezing the GUI.
+
+    Attributes:
+        dropped (int): Rounds rejected because the queue stayed full.
+        errors (int): Batches that failed to write.
+        last_error (Exception): Most recent write or open error, else None.
+        path (str): Path of the database file.
+        roundlog_path (str): Path of the binary round log, None to skip it.
+    """
+
+    # Queue item telling the writer thread to stop:
+    _STOP = object()
+
+    def __init__(self,
+                 path: str = DEFAULT_HISTORY_PATH,
+                 maxsize: int = 64,
+                 batch_size: int = 32,
+                 roundlog_path: str = None):
+        """
+        Initialize `HistoryWriter()` object and start its thread.
+
+        Args:
+            path (str): Path of the database file. Default is DEFAULT_HISTORY_PATH.
+            roundlog_path (str): Path of a binary round log to append to. Default is None.
+            maxsize (int): Rounds that may wait in the queue. Default is 64.
+            batch_size (int): Most rounds written per transaction. Default is 32.
+        """
+        self.path = path
+        self.roundlog_path = roundlog_path
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self._queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, name="cpt-history-writer", daemon=True)
+        self._thread.start()
+
+    def save_round(self, user: str, session, timeout: float = 0.25) -> bool:
+        """
+        Queues a finished session for writing.
+
+        Args:
+            user (str): Name the round is stored under.
+            session (TypingSession): Session after `finish()`, see `cpt_session.py`.
+            timeout (float): Seconds to wait for room in a full queue. Default is 0.25.
+
+        Returns:
+            bool: True if the round was queued, False if it was dropped.
+        """
+        rows = HistoryStore.round_rows(user, session)
+        try:
+            self._queue.put(rows, timeout=timeout)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self):
+        """
+        Blocks until every queued round has been written or has failed.
+        """
+        self._queue.join()
+
+    def close(self, timeout: float = 5.0):
+        """
+        Writes what's queued and stops the thread, waiting at most `timeout` seconds.
+
+        Args:
+            timeout (float): Seconds to wait for the writer thread. Default is 5.0.
+        """
+        if self._thread.is_alive():
+            # One deadline for both waits, so Tk is never held longer than timeout:
+            deadline = time.monotonic() + timeout
+            try:
+                self._queue.put(self._STOP, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(max(0.0, deadline - time.monotonic()))
+
+    def _write(self, store, roundlog, batch):
+        """
+        Private method.
+        Writes a batch in one transaction, recording rather than raising errors.
+        """
+        try:
+            if store is None:
+                raise self.last_error
+            store.save_rounds(batch)
+            if roundlog is not None:
+                roundlog.append(round_row for round_row, _ in batch)
+        except (sqlite3.Error, OSError) as error:
+            self.errors += 1
+            self.last_error = error
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self):
+        """
+        Private method.
+        Writer thread: coalesces queued rounds into batches until told to stop.
+        """
+        try:
+            store = HistoryStore(self.path)
+        except (sqlite3.Error, OSError) as error:
+            store = None
+            self.last_error = error
+        try:
+            roundlog = RoundLogWriter(self.roundlog_path) if self.roundlog_path else None
+        except (OSError, ValueError) as error:
+            roundlog = None
+            self.last_error = error
+
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch = []
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                    self._queue.task_done()
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(store, roundlog, batch)
+
+        if store is not None:
+            store.close()
+        if roundlog is not None:
+            roundlog.close()
@@ -0,0 +1,291 @@
+"""
+Streaming ingestion of raw text into the four word bank tiers.
+
+Local text files, e.g. Project Gutenberg books or script dumps of any size, flow
+through a chain of generators, so only a block of text and a bounded number of
+sentence chunks are in memory at any time:
+
+    1. read:    fixed-size blocks of each file.
+    2. segment: sentences, split at terminal punctuation or blank lines.
+    3. clean:   typographic quotes and dashes to ASCII, markup removed, spacing
+                normalized, unusable sentences dropped. This stage runs on a pool
+                of worker processes, one per core by default.
+    4. bucket:  sentences by length into `long_sentences` and `short_sentences`,
+                and their words into `words_two` pairs and `words_one` words.
+    5. dedup:   case-insensitive, keeping a 64-bit digest per prompt kept.
+
+Each tier is written as a `cpt_<tier>.py` module in the format of the `static`
+modules, one prompt per line as it arrives. Copy the modules into `static` and
+cpt_corpus.py rebuilds its blobs on the next start.
+
+Usage:
+    python cpt_ingest.py FILE [FILE ...] [--output DIR] [--workers N] [--chunk-size N]
+
+Functions:
+    bucket(sentences): Assigns cleaned sentences, and their words, to tiers.
+    clean_sentence(sentence): Cleaned prompt text of a sentence, or None.
+    clean_sentences(sentences, workers, chunk_size): Cleans a stream on worker processes.
+    dedup(pairs): Drops prompts already seen in their tier, ignoring case.
+    ingest(paths, directory, workers, chunk_size): Runs the whole pipeline.
+    read_blocks(paths, block_size): Streams the text of files in blocks.
+    segment(blocks): Splits a stream of text blocks into sentences.
+    write_tiers(pairs, directory): Streams (tier, prompt) pairs into tier modules.
+"""
+
+# Import Python libraries:
+import argparse
+import hashlib
+import os
+import re
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Import project modules:
+from cpt_corpus import TIER_MODULES
+
+# Sentence boundary: terminal punctuation and closing quotes before whitespace, or a blank line:
+_BOUNDARY = re.compile(r"""[.!?]+["')\]]*(?=\s)|\n[ \t]*\n""")
+# Text after which a run without any boundary is cut off anyway:
+_MAX_CARRY = 10000
+
+# Typographic characters and their ASCII equivalents:
+_ASCII = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"',
+                        "–": "-", "—": " - ", "…": "..."})
+# Emphasis markup, bracketed notes and line-drawing leftovers:
+_MARKUP = re.compile(r"[_*]|\[[^\]]*\]|\{[^}]*\}|--+")
+_SPACES = re.compile(r"\s+")
+_WORD = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+
+# Tier limits, matching the hand-made word banks:
+_LONG_WORDS, _LONG_CHARS = range(5, 13), 60
+_SHORT_WORDS, _SHORT_CHARS = range(2, 6), 25
+_MAX_WORD_CHARS = 18
+
+
+def read_blocks(paths, block_size: int = 1 << 20):
+    """
+    Streams the text of files in blocks.
+
+    Args:
+        paths (iterable of str): Text files, read as UTF-8 with bad bytes replaced.
+        block_size (int): Characters per block. Default is 1 MiB.
+
+    Yields:
+        str: Consecutive blocks; a blank line separates files.
+    """
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as source:
+            while True:
+                block = source.read(block_size)
+                if not block:
+                    break
+                yield block
+        yield "\n\n"
+
+
+def segment(blocks):
+    """
+    Splits a stream of text blocks into sentences.
+
+    Args:
+        blocks (iterable of str): Consecutive pieces of text.
+
+    Yields:
+        str: Raw sentences, including their terminal punctuation.
+    """
+    carry = ""
+    for block in blocks:
+        text = carry + block
+        start = 0
+        for boundary in _BOUNDARY.finditer(text):
+            yield text[start:boundary.end()]
+            start = boundary.end()
+        carry = text[start:]
+        if len(carry) > _MAX_CARRY:
+            yield carry
+            carry = ""
+    if carry.strip():
+        yield carry
+
+
+def clean_sentence(sentence: str):
+    """
+    Cleaned prompt text of a sentence, or None.
+
+    Args:
+        sentence (str): A raw sentence from `segment()`.
+
+    Returns:
+        str or None: Printable ASCII with single spaces, or None if nothing
+            typeable is left.
+    """
+    text = unicodedata.normalize("NFKC", sentence).translate(_ASCII)
+    text = _MARKUP.sub(" ", text)
+    # A quote opened or closed outside the sentence can't be typed sensibly:
+    if text.count('"') % 2:
+        text = text.replace('"', " ")
+    text = _SPACES.sub(" ", text).strip(" -")
+    if not text or not text.isascii() or not text.isprintable() or not _WORD.search(text):
+        return None
+    return text
+
+
+def _clean_chunk(chunk: list) -> list:
+    """
+    Private function.
+    Worker process task, cleans a chunk of sentences and drops the rejects.
+    """
+    return [text for text in map(clean_sentence, chunk) if text is not None]
+
+
+def clean_sentences(sentences, workers: int = None, chunk_size: int = 2000):
+    """
+    Cleans a stream of sentences on worker processes, keeping their order.
+
+    At most two chunks per worker are in flight, so the stream is never read
+    further ahead than that.
+
+    Args:
+        sentences (iterable of str): Raw sentences.
+        workers (int): Number of worker processes. Default is None, one per core.
+        chunk_size (int): Sentences per task. Default is 2000.
+
+    Yields:
+        str: Cleaned sentences.
+    """
+    workers = workers or os.cpu_count() or 1
+    sentences = iter(sentences)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < workers * 2:
+                chunk = list(islice(sentences, chunk_size))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_clean_chunk, chunk))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+
+def bucket(sentences):
+    """
+    Assigns cleaned sentences, and their words, to tiers.
+
+    Sentences of 5 to 12 words and at most 60 characters go to long_sentences,
+    those of 2 to 5 words and at most 25 characters to short_sentences. Every
+    sentence's plain words go to words_one, and consecutive pairs of them to
+    words_two.
+
+    Args:
+        sentences (iterable of str): Cleaned sentences.
+
+    Yields:
+        tuple: (tier name, prompt) pairs.
+    """
+    for sentence in sentences:
+        words = sentence.split()
+        if len(words) in _LONG_WORDS and len(sentence) <= _LONG_CHARS:
+            yield "long_sentences", sentence
+        elif len(words) in _SHORT_WORDS and len(sentence) <= _SHORT_CHARS:
+            yield "short_sentences", sentence
+
+        plain = [word.strip(".,;:!?\"'()") for word in words]
+        plain = [word if _WORD.fullmatch(word) and len(word) <= _MAX_WORD_CHARS else None
+                 for word in plain]
+        for first, second in zip(plain[::2], plain[1::2]):
+            if first and second:
+                yield "words_two", f"{first} {second}"
+        for word in plain:
+            if word:
+                yield "words_one", word
+
+
+def dedup(pairs):
+    """
+    Drops prompts already seen in their tier, ignoring case.
+
+    Args:
+        pairs (iterable of tuple): (tier name, prompt) pairs.
+
+    Yields:
+        tuple: The first (tier name, prompt) pair of every distinct prompt.
+    """
+    seen = {name: set() for name in TIER_MODULES}
+    for name, prompt in pairs:
+        digest = int.from_bytes(hashlib.blake2b(prompt.casefold().encode("utf-8"),
+                                                digest_size=8).digest(), "little")
+        if digest not in seen[name]:
+            seen[name].add(digest)
+            yield name, prompt
+
+
+def write_tiers(pairs, directory: str) -> dict:
+    """
+    Streams (tier name, prompt) pairs into `cpt_<tier>.py` modules.
+
+    Args:
+        pairs (iterable of tuple): (tier name, prompt) pairs.
+        directory (str): Directory to write the modules to, created if needed.
+
+    Returns:
+        dict: Number of prompts written per tier.
+    """
+    os.makedirs(directory, exist_ok=True)
+    counts = dict.fromkeys(TIER_MODULES, 0)
+    modules = {}
+    try:
+        for name in TIER_MODULES:
+            modules[name] = open(os.path.join(directory, f"cpt_{name}.py.tmp"), "w",
+                                 encoding="utf-8")
+            modules[name].write(f'"""\nImported by `cpt_corpus.py` for use in the Tkinter GUI.\n\n'
+                                f'Variable:\n    {name} (list): Prompts ingested by '
+                                f'cpt_ingest.py.\n"""\n\n{name} = [\n')
+        for name, prompt in pairs:
+            modules[name].write(f"    {prompt!r},\n")
+            counts[name] += 1
+        for module in modules.values():
+            module.write("]\n")
+    finally:
+        for module in modules.values():
+            module.close()
+    for name in TIER_MODULES:
+        path = os.path.join(directory, f"cpt_{name}.py")
+        os.replace(f"{path}.tmp", path)
+    return counts
+
+
+def ingest(paths, directory: str, workers: int = None, chunk_size: int = 2000) -> dict:
+    """
+    Runs the whole pipeline over some text files.
+
+    Args:
+        paths (iterable of str): Text files to ingest.
+        directory (str): Directory to write the tier modules to.
+        workers (int): Cleaning processes. Default is None, one per core.
+        chunk_size (int): Sentences per cleaning task. Default is 2000.
+
+    Returns:
+        dict: Number of prompts written per tier.
+    """
+    sentences = clean_sentences(segment(read_blocks(paths)), workers, chunk_size)
+    return write_tiers(dedup(bucket(sentences)), directory)
+
+
+# Ingest text files from the command line:
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build word bank tiers from raw text files.")
+    parser.add_argument("files", nargs="+", help="text files to ingest")
+    parser.add_argument("--output", default="ingested",
+                        help="directory for the tier modules (default: ingested)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="cleaning processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=2000,
+                        help="sentences per cleaning task (default: 2000)")
+    arguments = parser.parse_args()
+    written = ingest(arguments.files, arguments.output, arguments.workers, arguments.chunk_size)
+    for tier_name, count in written.items():
+        print(f"{tier_name}: {count} prompts -> "
+              f"{os.path.join(arguments.output, f'cpt_{tier_name}.py')}")
@@ -0,0 +1,240 @@
+"""
+Opt-in latency instrumentation for the Tkinter GUI of cpt_main.py.
+
+Three parts, all feeding fixed-bucket histograms:
+
+    - A heartbeat `after()` probe that asks to run every few milliseconds and
+      records how late it actually ran. Lag here means the main loop was busy,
+      or the machine didn't give the process the CPU.
+    - Timing wrappers around the GUI's hot paths, e.g. `user_entry` and
+      `countdown_update`. Time spent there is the app's own.
+    - `LatencyHistogram`, an HDR-style histogram: buckets are linear within each
+      power of two, so every recorded value keeps about 3% precision from one
+      microsecond to hours, in a fixed array of counters.
+
+Comparing the two, a reported lag can be pinned on the app or on the machine.
+Enable it with `python cpt_main.py --instrument latency.json`; the histograms
+are written to the file when the app exits.
+
+Classes:
+    Instrumentation: Heartbeat probe, timing wrappers and their histograms.
+    LatencyHistogram: Fixed-bucket, log-linear histogram of microsecond latencies.
+"""
+
+# Import Python libraries:
+import functools
+import json
+import math
+import platform
+import time
+from array import array
+
+# Values below 2 ** 6 = 64 get a bucket each, every later power of two 32, about 3% precision:
+_SUB_BUCKET_BITS = 6
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_HALF = _SUB_BUCKETS // 2
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket, log-linear histogram of microsecond latencies.
+
+    Values below 64 get a bucket each; above, each power of two is split into 32
+    equal buckets. Recording is O(1) and never allocates.
+
+    Attributes:
+        count (int): Values recorded.
+        highest_us (int): Largest trackable value; larger values are clamped to it.
+        max_us (int): Largest value recorded.
+        total_us (int): Sum of the values recorded.
+    """
+
+    def __init__(self, highest_us: int = 3600 * 10 ** 6):
+        """
+        Initialize `LatencyHistogram()` object.
+
+        Args:
+            highest_us (int): Largest trackable value. Default is one hour.
+        """
+        self.highest_us = highest_us
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self._counts = array("Q", bytes(8 * (self._index(highest_us) + 1)))
+
+    @staticmethod
+    def _index(value: int) -> int:
+        """
+        Private method.
+        Bucket of a non-negative value.
+        """
+        if value < _SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - _SUB_BUCKET_BITS
+        return _SUB_BUCKETS + (shift - 1) * _HALF + (value >> shift) - _HALF
+
+    @staticmethod
+    def _upper(index: int) -> int:
+        """
+        Private method.
+        Largest value that falls in a bucket.
+        """
+        if index < _SUB_BUCKETS:
+            return index
+        shift, top = divmod(index - _SUB_BUCKETS, _HALF)
+        return ((top + _HALF + 1) << (shift + 1)) - 1
+
+    def record(self, value_us: int):
+        """
+        Records one latency.
+
+        Args:
+            value_us (int): Latency in microseconds; negative values count as 0.
+        """
+        value_us = min(max(int(value_us), 0), self.highest_us)
+        self._counts[self._index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        self.max_us = max(self.max_us, value_us)
+
+    def percentile(self, percent: float) -> int:
+        """
+        Latency at or below which a percentage of the recorded values fall.
+
+        Args:
+            percent (float): Between 0 and 100.
+
+        Returns:
+            int: Upper bound of the bucket holding that rank, in microseconds.
+        """
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self._upper(index), self.max_us)
+        return self.max_us
+
+    def summary(self) -> dict:
+        """
+        Count, mean, percentiles and non-empty buckets, in JSON-ready form.
+
+        Returns:
+            dict: Millisecond figures, plus [bucket upper bound in us, count] pairs.
+        """
+        return {"count": self.count,
+                "mean_ms": self.total_us / self.count / 1000 if self.count else 0.0,
+                "max_ms": self.max_us / 1000,
+                **{f"p{label}_ms": self.percentile(percent) / 1000
+                   for label, percent in (("50", 50), ("90", 90), ("99", 99), ("99_9", 99.9))},
+                "buckets": [[self._upper(index), bucket_count]
+                            for index, bucket_count in enumerate(self._counts) if bucket_count]}
+
+
+class Instrumentation:
+    """
+    Heartbeat probe, timing wrappers and their histograms.
+
+    Attributes:
+        heartbeat_ms (int): Interval the heartbeat asks for, in milliseconds.
+        histograms (dict): Name to LatencyHistogram; "main_loop_lag" for the heartbeat.
+        path (str): File the histograms are dumped to.
+        started_at (float): Unix time the instrumentation was created.
+    """
+
+    def __init__(self, path: str, heartbeat_ms: int = 50):
+        """
+        Initialize `Instrumentation()` object.
+
+        Args:
+            path (str): File to dump the histograms to.
+            heartbeat_ms (int): Interval the heartbeat asks for. Default is 50.
+        """
+        self.path = path
+        self.heartbeat_ms = heartbeat_ms
+        self.histograms = {}
+        self.started_at = time.time()
+        self._root = None
+        self._expected_ns = None
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        """
+        The histogram of a name, created on first use.
+        """
+        if name not in self.histograms:
+            self.histograms[name] = LatencyHistogram()
+        return self.histograms[name]
+
+    def wrap(self, cls, *names):
+        """
+        Times methods of a class, for every instance and every caller.
+
+        Wrap before creating instances, so callbacks registered during
+        construction, e.g. by `setup_gui`, are timed too.
+
+        Args:
+            cls (type): Class whose methods to wrap.
+            *names (str): Method names; each gets a histogram of the same name.
+        """
+        for name in names:
+            setattr(cls, name, self._timed(name, getattr(cls, name)))
+
+    def _timed(self, name: str, method):
+        """
+        Private method.
+        Wraps a function to record its wall time in microseconds.
+        """
+        histogram = self.histogram(name)
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.record((time.perf_counter_ns() - start) // 1000)
+
+        return timed
+
+    def start_heartbeat(self, root):
+        """
+        Starts the main-loop lag probe.
+
+        Args:
+            root (Tk): Tkinter window whose `after()` schedules the probe.
+        """
+        self._root = root
+        self._schedule()
+
+    def _schedule(self):
+        """
+        Private method.
+        Schedules the next heartbeat and remembers when it is due.
+        """
+        self._expected_ns = time.perf_counter_ns() + self.heartbeat_ms * 1_000_000
+        self._root.after(self.heartbeat_ms, self._beat)
+
+    def _beat(self):
+        """
+        Private method.
+        Records how late the heartbeat ran, then schedules the next one.
+        """
+        self.histogram("main_loop_lag").record(
+            (time.perf_counter_ns() - self._expected_ns) // 1000)
+        self._schedule()
+
+    def dump(self):
+        """
+        Writes every histogram and some environment metadata to `path` as JSON.
+        """
+        report = {"started_at": self.started_at,
+                  "finished_at": time.time(),
+                  "heartbeat_ms": self.heartbeat_ms,
+                  "python": platform.python_version(),
+                  "platform": platform.platform(),
+                  "histograms": {name: histogram.summary()
+                                 for name, histogram in self.histograms.items()}}
+        with open(self.path, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
@@ -0,0 +1,162 @@
+"""
+High-resolution keystroke log for use in the Tkinter GUI via cpt_main.py.
+
+Every `<KeyPress>` in the typing field is recorded as a nanosecond delta since
+the previous key, its keycode and a few flag bits, into preallocated `array`
+columns used as a ring buffer. Recording stores plain integers into existing
+slots: no tuple, dict or other GC-tracked object is created per keystroke.
+
+Variables:
+    FLAG_BACKSPACE (int - constant): Flag bit for BackSpace.
+    FLAG_CONTROL (int - constant): Flag bit for a key pressed with Control held.
+    FLAG_RETURN (int - constant): Flag bit for Return.
+    FLAG_SHIFT (int - constant): Flag bit for a key pressed with Shift held.
+    KeystrokeSummary (namedtuple): Inter-key latency, burst and hesitation figures.
+
+Classes:
+    KeyLog: Preallocated ring buffer of keystroke events.
+"""
+
+# Import Python libraries:
+import time
+from array import array
+from collections import namedtuple
+from statistics import median
+
+# Flag bits stored per keystroke:
+FLAG_SHIFT = 1
+FLAG_CONTROL = 2
+FLAG_BACKSPACE = 4
+FLAG_RETURN = 8
+
+# Tk event.state modifier masks:
+_STATE_SHIFT = 0x1
+_STATE_CONTROL = 0x4
+
+# Inter-key latency, burst and hesitation figures, in milliseconds and keys per second:
+KeystrokeSummary = namedtuple("KeystrokeSummary",
+                              ["keys", "mean_ms", "median_ms", "burst_kps", "hesitations"])
+
+
+class KeyLog:
+    """
+    Preallocated ring buffer of keystroke events.
+
+    Once `capacity` keys have been recorded the oldest are overwritten.
+
+    Attributes:
+        capacity (int): Maximum number of keystrokes kept.
+        clock (callable): Returns the current time in integer nanoseconds.
+    """
+
+    def __init__(self, capacity: int = 8192, clock=time.perf_counter_ns):
+        """
+        Initialize `KeyLog()` object.
+
+        Args:
+            capacity (int): Maximum number of keystrokes kept. Default is 8192.
+            clock (callable): Integer nanosecond clock. Default is `time.perf_counter_ns`.
+        """
+        self.capacity = capacity
+        self.clock = clock
+        self._deltas = array("Q", bytes(8 * capacity))
+        self._keycodes = array("I", bytes(4 * capacity))
+        self._flags = array("B", bytes(capacity))
+        self._next = 0
+        self._count = 0
+        self._last_ns = 0
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        """
+        Forgets every recorded keystroke, keeping the allocated columns.
+        """
+        self._next = 0
+        self._count = 0
+        self._last_ns = 0
+
+    def record(self, keycode: int, flags: int = 0):
+        """
+        Records one keystroke at the current time.
+
+        Args:
+            keycode (int): Platform keycode of the key.
+            flags (int): FLAG_* bits. Default is 0.
+        """
+        now = self.clock()
+        slot = self._next
+        self._deltas[slot] = now - self._last_ns if self._count else 0
+        self._keycodes[slot] = keycode
+        self._flags[slot] = flags
+        self._last_ns = now
+        self._next = slot + 1 if slot + 1 < self.capacity else 0
+        if self._count < self.capacity:
+            self._count += 1
+
+    def on_key(self, event):
+        """
+        `<KeyPress>` handler, records the event's keycode and modifier flags.
+
+        Args:
+            event: The Tkinter key event.
+        """
+        flags = 0
+        if event.state & _STATE_SHIFT:
+            flags |= FLAG_SHIFT
+        if event.state & _STATE_CONTROL:
+            flags |= FLAG_CONTROL
+        if event.keysym == "BackSpace":
+            flags |= FLAG_BACKSPACE
+        elif event.keysym == "Return":
+            flags |= FLAG_RETURN
+        self.record(event.keycode, flags)
+
+    def snapshot(self):
+        """
+        Copies the recorded keystrokes out in chronological order.
+
+        Meant for the end of a round, it's the only method that allocates per key.
+
+        Returns:
+            tuple: (deltas, keycodes, flags) arrays of equal length.
+        """
+        start = self._next - self._count
+        columns = []
+        for column in (self._deltas, self._keycodes, self._flags):
+            if start >= 0:
+                columns.append(column[start:self._next])
+            else:
+                columns.append(column[start:] + column[:self._next])
+        return tuple(columns)
+
+    def summary(self, hesitation_ms: float = 1000, burst_keys: int = 10) -> KeystrokeSummary:
+        """
+        Inter-key latency, burst speed and hesitations of the recorded keystrokes.
+
+        Args:
+            hesitation_ms (float): Gaps at least this long count as hesitations. Default is 1000.
+            burst_keys (int): Keys in the window used for burst speed. Default is 10.
+
+        Returns:
+            KeystrokeSummary: The figures, zeros if fewer than two keys were recorded.
+        """
+        deltas = self.snapshot()[0][1:]
+        if not deltas:
+            return KeystrokeSummary(self._count, 0.0, 0.0, 0.0, 0)
+
+        # Fastest run of `burst_keys` consecutive intervals, as a sliding window sum:
+        window = min(burst_keys, len(deltas))
+        total = fastest = sum(deltas[:window])
+        for i in range(window, len(deltas)):
+            total += deltas[i] - deltas[i - window]
+            fastest = min(fastest, total)
+        burst_kps = window / (fastest / 1e9) if fastest else 0.0
+
+        hesitation_ns = hesitation_ms * 1e6
+        return KeystrokeSummary(keys=self._count,
+                                mean_ms=sum(deltas) / len(deltas) / 1e6,
+                                median_ms=median(deltas) / 1e6,
+                                burst_kps=burst_kps,
+                                hesitations=sum(1 for delta in deltas if delta >= hesitation_ns))
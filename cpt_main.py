@@ -1,14 +1,27 @@
 # Import Python libraries:
-from random import choice
+import getpass
+import sys
+
+# `python cpt_main.py score ...` scores a JSONL file instead, see `cpt_batch.py`.
+# Dispatched before Tkinter is imported or any word bank is mapped:
+if __name__ == "__main__" and sys.argv[1:2] == ["score"]:
+    import cpt_batch
+    sys.exit(cpt_batch.main(sys.argv[2:]))
+
 from tkinter import *
 from tkinter import messagebox
+from tkinter.font import Font
 
 # Import data from `static` directory:
 from static.cpt_config import about_text, help_text, COLOR_MAP, COLORS
-from static.cpt_long_sentences import long_sentences
-from static.cpt_short_sentences import short_sentences
-from static.cpt_words_one import words_one
-from static.cpt_words_two import words_two
+from cpt_corpus import CorpusLoader
+from cpt_countdown import Countdown
+from cpt_history import HistoryWriter
+from cpt_instrument import Instrumentation
+from cpt_roundlog import DEFAULT_ROUNDLOG_PATH
+from cpt_router import InputRouter
+from cpt_session import TypingSession
+from cpt_view import ViewState
 
 
 class CheckPracticeTyping:
@@ -16,57 +29,60 @@ class CheckPracticeTyping:
     Class to create a GUI for testing and improving the user's typing speed.
 
     This class uses Tkinter to build a user interface, imports data from `cts_data`,
-    and provides a typing test for the user. It also calculates typing statistics like
-    Words Per Minute (WPM) and word accuracy percentage.
+    and provides a typing test for the user. The rules and statistics, like Words Per
+    Minute (WPM) and word accuracy percentage, live in a headless `TypingSession`;
+    this class only adapts it to Tkinter widgets and events.
 
     Attributes:
         about_button (Button): Represents the 'About' button in the GUI.
+        countdown (Countdown): Deadline-based scheduler ticking countdown_update.
         countdown_label (Label): Widget displaying the countdown during the typing test.
         counting_down (bool): Flag indicating whether the countdown is currently active.
         current_row (int): Current row in the GUI layout.
-        entry_accuracy (float): Success rate calculated as the percentage of correct entries.
         exit_button (Button): Represents the 'Exit' button in the GUI.
         go_again_button (Button): Represents the 'Go again' button in the GUI.
         gui_w (int): Width of the GUI window.
         gui_h (int): Height of the GUI window.
         help_button (Button): Represents the 'Help' button in the GUI.
+        history (HistoryWriter): Background writer saving finished rounds to the database and round log.
+        live_error (bool): Whether user_text is currently highlighted as containing an error.
         move_x (int): X-coordinate for the initial window position.
         move_y (int): Y-coordinate for the initial window position.
-        num_entries (int): Total number of entries during the typing test.
+        original_seconds (int): Duration of the typing test in seconds.
         root (Tk): The root Tkinter window for the applicatio
-        seconds (int): Initial value for the countdown timer in seconds.
+        router (InputRouter): Single owner of user_text's trace and key bindings.
+        seconds (int): Seconds left on the countdown, as displayed.
+        session (TypingSession): Headless state, rules and statistics of the typing test.
         test_text (Label): Widget displaying the text for the user to copy during the typing test.
         test_text_next (str): Randomly selected word for the next typing test.
-        user_text_var (StringVar): Tkinter variable for tracking changes in the user_text widget.
+        user_text_var (StringVar): Tkinter variable for tracking changes in the user_text widget, for the app's lifetime.
         thumb (str): Default message for the thumb indicator.
         thumb_color (str): Default color for the thumb indicator.
-        total_words (int): Total number of words in the typing test.
         title_label (Label): Widget displaying the title of the GUI.
-        user_right (int): Number of correctly typed entries/sentences during the typing test.
+        user (str): Name the user's rounds are saved under.
         user_text (Entry): Widget where the user types during the typing test.
         user_text_feedback (Label): Widget displaying the thumb indicator for the typing test.
-        user_wrong (int): Number of incorrectly typed entries during the typing test.
-        word_accuracy (float): Percentage of correctly typed words in the typing test.
+        view (ViewState): Last rendered widget options, so only real changes reach Tk.
         words_feedback (list): List to store feedback for each word in the typing test.
-        words_right (int): Number of correctly typed words during the typing text.
-        wpm_str (str): User's typing Words Per Minute (WPM) stat.
+        wpm_str (str): User's typing net Words Per Minute (WPM) and CPM stats.
         y_padding (int): Vertical padding value for the GUI layout.
 
     Methods:
         about_popup(): 'About' button command, displays application information.
-        _calculate_accuracy(): Calculates and displays typing accuracy percentages. Private method.
         color_mapping(): Determines the color of the countdown label text based on the second count.
         countdown_trigger(): Triggers a continuation of the countdown for the typing test.
         countdown_update(): Updates the countdown display during the typing test.
         _countdown_zero():  Resets attributes to their default state. Private method.
         _reset_widgets(): Resets various widgets to their initial state. Called by self.go_again(). Private method.
         _reset_instance_attributes(): Ensures instance attributes are reset. Called by self.go_again(). Private method.
-        _trace_user_text_var(): Private method. Calls self.countdown_trigger() whenever self.user_text_var is assigned a new value. Called by self.go_again(). Private method.
         go_again(): Resets for a new typing round.
         help_popup(): 'Help' button command, displays help information.
         increment_row(): Increments the current row in the GUI layout.
+        quit_app(): Writes pending history and quits, 'Exit' button and window close command.
+        _user_text_write(): Diffs the typed text and updates the countdown on every keystroke. Private method.
         user_entry(event): Handles user's typing input and updates typing statistics.
         setup_gui(): Sets up the entire GUI for the typing test.
+        _show_prompt(prompt): Displays a prepared prompt in test_text. Private method.
     """
 
     def __init__(self,
@@ -75,7 +91,8 @@ class CheckPracticeTyping:
                  gui_w: int = 480,
                  gui_h: int = 640,
                  move_x: int = 0,
-                 move_y: int = 0):
+                 move_y: int = 0,
+                 user: str = None):
         """
         Initialize `CheckPracticeTyping()` object.
 
@@ -86,6 +103,7 @@ class CheckPracticeTyping:
             gui_h (int): Height of the GUI window. Default is 640.
             move_x (int): X-coordinate for the initial window position. Default is 0.
             move_y (int): Y-coordinate for the initial window position. Default is 0.
+            user (str): Name rounds are saved under. Default is None, the login name.
         """
 
         # Tkinter main window attributes:
@@ -106,6 +124,7 @@ class CheckPracticeTyping:
         self.test_text = None
         # Row 4:
         self.user_text = None
+        self.router = None
         # Row 5:
         self.user_text_feedback = None
         # Row 6:
@@ -115,23 +134,32 @@ class CheckPracticeTyping:
         self.exit_button = None
         self.about_button = None
 
+        # Widget updates are diffed and sent once per event-loop turn, see `cpt_view.py`:
+        self.view = ViewState(self.root)
+
+        # Round history, written on a background thread, see `cpt_history.py`:
+        self.user = user or getpass.getuser()
+        self.history = HistoryWriter(roundlog_path=DEFAULT_ROUNDLOG_PATH)
+
+        # Headless typing test, see `cpt_session.py`. Its memory-mapped word banks,
+        # see `cpt_corpus.py`, load only `long_sentences` here; the other tiers are
+        # prefetched once the window is up:
+        self.session = TypingSession(CorpusLoader(), seconds)
+
+        # Countdown ticks on whole seconds before the session's deadline:
+        self.countdown = Countdown(self.root, self.session.remaining, self.countdown_update)
+
         # String attributes:
         self.user_text_var = StringVar()
-        self.test_text_next = choice(long_sentences)
+        self.test_text_next = self.session.current_prompt.text
+        self.live_error = False
 
         # General tabulation attributes:
         self.counting_down = False
-        self.num_entries = 0
-        self.total_words = 0
         self.original_seconds = seconds  # Class param: defaults to 60
         self.seconds = self.original_seconds
 
         # User-tracking attributes:
-        self.user_right = 0
-        self.user_wrong = 0
-        self.words_right = 0
-        self.entry_accuracy = 0
-        self.word_accuracy = 0
         self.words_feedback = list()
         self.wpm_str = ""
         self.thumb = "Type the phrase and hit 'Enter'"
@@ -140,6 +168,9 @@ class CheckPracticeTyping:
         # Automatically instantiate the GUI:
         self.setup_gui()
 
+        # Load the remaining word banks in the background after the first paint:
+        self.root.after_idle(self.session.corpus.prefetch)
+
     @staticmethod
     def about_popup():
         """
@@ -147,36 +178,18 @@ class CheckPracticeTyping:
         """
         messagebox.showinfo("About Check/Practice Typing", about_text, icon="info")
 
-    def _calculate_accuracy(self):
-        """
-        Private method.
-        Calculates and displays typing accuracy percentages.
-
-        This method sets the values of various attributes based on the user's
-        accuracy. Called by the countdown_update method.
-        """
-        if self.user_right == 0:
-            self.entry_accuracy = 0
-        else:
-            entry_accuracy = round(self.user_right / self.num_entries * 100)
-            self.entry_accuracy = entry_accuracy
-        if self.words_right == 0:
-            self.word_accuracy = 0
-        else:
-            word_accuracy = round(self.words_right / self.total_words * 100)
-            self.word_accuracy = word_accuracy
-
     def color_mapping(self):
         """
         Determines the color of the countdown label text based on the second count.
 
         This method iterates through the COLOR_MAP dictionary to find the color
         corresponding to the current number of seconds. It then updates the
-        countdown label text color accordingly.
+        countdown label text color through self.view, which only reaches Tk
+        when the color actually changes.
         """
         for limit, color in COLOR_MAP.items():
             if self.seconds < limit:
-                self.countdown_label.configure(fg=COLORS[color])
+                self.view.set(self.countdown_label, fg=COLORS[color])
                 break
 
     def countdown_trigger(self):
@@ -184,22 +197,28 @@ class CheckPracticeTyping:
         Triggers a continuation of the countdown for the typing test.
 
         This method sets the counting_down flag to True, indicating that the
-        countdown should continue. It then calls the countdown_update method.
+        countdown should continue, and starts the session's clock. It then starts
+        self.countdown, which calls the countdown_update method on every tick.
+        A finished round is never restarted; 'Go again' starts a new one.
         """
-        if not self.counting_down:
+        if not self.counting_down and not self.session.is_over():
             self.counting_down = True
-            self.countdown_update()
+            self.session.start()
+            self.countdown.start()
 
     def countdown_update(self):
         """
         Updates the countdown display during the typing test.
 
         This method updates the countdown label's text and color based on the
-        current value of the seconds attribute. It also handles the logic of
-        decrementing the countdown and updating the GUI accordingly.
+        seconds left on the session's clock. It's ticked by self.countdown, whose
+        last tick lands on the deadline, where it displays the results.
         """
         if self.counting_down:
-            self.go_again_button.configure(state="disabled", cursor="")
+            self.view.set(self.go_again_button, state="disabled", cursor="")
+
+            # Seconds left on the session's clock:
+            self.seconds = self.session.seconds_left()
 
             # Specify color of countdown display:
             self.color_mapping()
@@ -208,29 +227,31 @@ class CheckPracticeTyping:
             countdown_display = f"{self.seconds:02}"
 
             # Refresh `self.countdown_label`:
-            self.countdown_label.config(text=countdown_display)
-
-            # Continue countdown if seconds is 1 or greater:
-            if self.seconds > 0:
-                # Run `self.countdown_update()` every second:
-                self.root.after(1000, self.countdown_update)
-                # Subtract 1 from `self.seconds` every second:
-                self.seconds -= 1
+            self.view.set(self.countdown_label, text=countdown_display)
+
             # Countdown has reached 0:
-            else:
+            if self.seconds == 0:
                 self._countdown_zero()
 
-                # Calculate and display Words Per Minute (WPM) statistics:
-                self.wpm_str = f"{self.words_right} words per minute."
-                self.test_text.config(text=self.wpm_str, fg="dark green")
+                # Calculate typing accuracy percentages and speed over the elapsed time:
+                self.session.finish()
 
-                # Calculate and display typing accuracy percentages:
-                self._calculate_accuracy()
+                # Queue the round and its entries for the history database:
+                self.history.save_round(self.user, self.session)
+
+                # Display net Words Per Minute (WPM) and Characters Per Minute (CPM) statistics:
+                stats = self.session.stats
+                self.wpm_str = f"{stats.net_wpm:.0f} words per minute, {stats.cpm:.0f} CPM."
+                self.view.set(self.test_text,
+                              text=self.wpm_str,
+                              fg="dark green",
+                              font=("Source Sans 3 Black", 28))
 
                 # Display feedback on individual word accuracy and total entry correctness:
-                sentence_feedback = f"{self.word_accuracy}% individual words correct.\n"
-                sentence_feedback += f"{self.entry_accuracy}% total entries correct."
-                self.user_text_feedback.config(text=sentence_feedback, fg="dark green")
+                sentence_feedback = f"{self.session.word_accuracy}% individual words correct.\n"
+                sentence_feedback += f"{self.session.char_accuracy}% characters correct.\n"
+                sentence_feedback += f"{self.session.entry_accuracy}% total entries correct."
+                self.view.set(self.user_text_feedback, text=sentence_feedback, fg="dark green")
 
     def _countdown_zero(self):
         """
@@ -242,12 +263,12 @@ class CheckPracticeTyping:
         It's called by the countdown_update method.
         """
         self.counting_down = False
-        self.root.unbind("<Return>")  # Unbind <Return> key when countdown is 0
-        self.go_again_button.configure(state="normal", cursor="exchange")
-        self.countdown_label.config(text="--", fg="grey")
-        self.test_text.configure(text="")
+        self.router.accepting = False  # Ignore <Return> key when countdown is 0
+        self.view.set(self.go_again_button, state="normal", cursor="exchange")
+        self.view.set(self.countdown_label, text="--", fg="grey")
+        self.view.set(self.test_text, text="")
         self.user_text.delete(0, END)
-        self.user_text.configure(state="disabled")
+        self.view.apply(self.user_text, state="disabled")
 
     def _reset_widgets(self):
         """
@@ -259,22 +280,22 @@ class CheckPracticeTyping:
         method.
         """
         # Reset countdown label to initial state
-        self.countdown_label.config(text=f"{self.seconds:02}", fg="black")
+        self.view.set(self.countdown_label, text=f"{self.seconds:02}", fg="black")
 
         # Reset `test_text` label to default color
-        self.test_text.config(fg="black")
+        self.view.set(self.test_text, fg="black")
 
         # Enable the user_text Entry widget and set its text variable
-        self.user_text.configure(textvariable=self.user_text_var, state="normal")
+        self.view.apply(self.user_text, state="normal")
 
         # Reset thumb indicator text and color
-        self.user_text_feedback.config(text=self.thumb, fg=self.thumb_color)
+        self.view.set(self.user_text_feedback, text=self.thumb, fg=self.thumb_color)
 
         # Set focus to the user_text Entry widget
         self.user_text.focus_set()
 
-        # Bind the "Return" key to the user_entry method
-        self.root.bind("<Return>", self.user_entry)
+        # Forward the "Return" key to the user_entry method again
+        self.router.accepting = True
 
     def _reset_instance_attributes(self):
         """
@@ -284,27 +305,15 @@ class CheckPracticeTyping:
         This method resets the instance attributes to their initial values for a new
         typing round. It's called by the go_again method.
         """
-        # Select a new random sentence for the user to type
-        self.test_text_next = choice(long_sentences)
-        self.test_text.configure(text=self.test_text_next)
+        # Reset typing statistics and select a new random sentence for the user to type
+        self.session.reset()
+        self._show_prompt(self.session.current_prompt)
 
         # Reset countdown timer and related flags
         self.seconds = self.original_seconds
         self.counting_down = False
 
-        # Reset typing statistics
-        self.total_words = 0
-        self.words_right = 0
-        self.num_entries = 0
-        self.user_right = 0
-        self.user_wrong = 0
-        self.entry_accuracy = 0
-
-        # Reset text variable for user input
-        self.user_text_var = StringVar()
-
-        # Reset word accuracy and feedback attributes
-        self.word_accuracy = 0
+        # Reset feedback attributes
         self.words_feedback = list()
 
         # Reset display attributes
@@ -312,19 +321,6 @@ class CheckPracticeTyping:
         self.thumb = "Type the phrase and hit 'Enter'"
         self.thumb_color = "black"
 
-    def _trace_user_text_var(self):
-        """
-        Private method.
-        Calls self.countdown_trigger() whenever self.user_text_var is assigned a new value.
-        Called by self.go_again().
-
-        This method uses Tkinter's trace method to call countdown_trigger whenever
-        self.user_text_var is assigned a new value. It's called by the go_again method.
-        """
-        # Set up a trace on self.user_text_var to trigger self.countdown_trigger on write
-        self.user_text_var.trace_add("write",
-                                     lambda name, index, mode: self.countdown_trigger())
-
     def go_again(self):
         """
         Resets for a new typing round.
@@ -332,15 +328,13 @@ class CheckPracticeTyping:
         This method resets the GUI and instance attributes for a new typing round.
         It's triggered by the 'Go again' button.
         """
-        # Reset instance attributes for a new typing round
+        # Stop any countdown still ticking and reset instance attributes for a new typing round
+        self.countdown.cancel()
         self._reset_instance_attributes()
 
-        # Reset various widgets to their initial state
+        # Reset various widgets to their initial state; self.router keeps routing input
         self._reset_widgets()
 
-        # Set up trace on self.user_text_var to trigger countdown on text change
-        self._trace_user_text_var()
-
     @staticmethod
     def help_popup():
         """
@@ -362,6 +356,16 @@ class CheckPracticeTyping:
         # Increment the current row for proper widget placement
         self.current_row += 1
 
+    def quit_app(self):
+        """
+        Writes pending history and quits, 'Exit' button and window close command.
+
+        This method waits a few seconds at most for the history writer thread
+        to save queued rounds, then ends the Tkinter main loop.
+        """
+        self.history.close()
+        self.root.quit()
+
     def user_entry(self, event):
         """
         Handles user's typing input and updates typing statistics.
@@ -372,67 +376,68 @@ class CheckPracticeTyping:
         This method handles the user's typing input, updates typing statistics,
         and triggers necessary actions based on the input event.
         """
-        # Get the text typed by the user and clear the input field
-        typed_text = self.user_text.get()
+        # Score the typed text against the current text, then clear the input field
+        result = self.session.submit(self.user_text.get())
         self.user_text.delete(0, END)
 
-        # Get the current text that the user is supposed to type
-        current_text = self.test_text.cget("text")
-
-        # Split the current text into individual words
-        current_text_split = current_text.split()
-
-        # Split the typed text into individual words
-        typed_text_split = typed_text.split()
-
-        # Update total word count based on the current text
-        self.total_words += len(current_text_split)
-
-        # Check how many words the user typed correctly
-        for i in current_text_split:
-            if i in typed_text_split:
-                self.words_right += 1
-
         # Check if the entire typed text matches the current text
-        if typed_text == current_text:
-            self.user_right += 1
+        if result.correct:
             self.thumb = "✔"
             self.thumb_color = COLORS["DARK_GREEN"]
         else:
-            self.user_wrong += 1
             self.thumb = "✖"
             self.thumb_color = COLORS["RED4"]
 
-        # Increment the total number of entries
-        self.num_entries += 1
-
-        # Calculate entry correctness percentage
-        if self.user_right == 0:
-            self.entry_accuracy = 0
-        else:
-            self.entry_accuracy = f"{(self.user_right / self.num_entries * 100):.2f}"
-
         # Update the thumb indicator based on correctness
-        self.user_text_feedback.config(text=self.thumb, fg=self.thumb_color)
-
-        # Choose the next text for the user to type based on the remaining time
-        if self.seconds > 40:
-            self.test_text_next = choice(long_sentences)
-        elif self.seconds > 25:
-            self.test_text_next = choice(short_sentences)
-        elif self.seconds > 10:
-            self.test_text_next = choice(words_two)
-        else:
-            self.test_text_next = choice(words_one)
+        self.view.set(self.user_text_feedback, text=self.thumb, fg=self.thumb_color)
 
-        # Update the displayed text for the next typing round
+        # Take the next prepared text for the user to type based on the remaining time
+        tier = self.session.tier()
         if self.counting_down:
-            self.test_text.config(text=self.test_text_next)
+            self._show_prompt(self.session.next_prompt(tier))
+
+        # Prepare the following prompts once Tk is idle again
+        self.root.after_idle(self.session.prompts.refill, tier)
 
         # If the "Return" key was pressed, trigger the countdown
         if event.keysym == "Return":
             self.countdown_trigger()
 
+    def _user_text_write(self):
+        """
+        Private method.
+        Diffs the typed text and updates the countdown on every keystroke.
+
+        Routed from the write trace on self.user_text_var. The user_text text turns
+        red as soon as it contains an error and back once the error is deleted;
+        the widget is only reconfigured when that state flips.
+        """
+        live_error = self.session.update_typed(self.user_text_var.get()) is not None
+        if live_error != self.live_error:
+            self.live_error = live_error
+            self.view.set(self.user_text, fg=COLORS["RED4"] if live_error else COLORS["BLACK"])
+        self.countdown_trigger()
+
+    def _show_prompt(self, prompt):
+        """
+        Private method.
+        Displays a prepared prompt in test_text.
+
+        Args:
+            prompt (Prompt): Prompt from self.session.
+
+        The font is scaled down from its default size when the prompt's measured
+        width would overflow the window.
+        """
+        self.test_text_next = prompt.text
+
+        # Shrink the font to fit the space between the window's side padding
+        size = 28
+        available = self.gui_w - 2 * 45
+        if prompt.width > available:
+            size = max(12, size * available // prompt.width)
+        self.view.set(self.test_text, text=prompt.text, font=("Source Sans 3 Black", size))
+
     def setup_gui(self):
         """
         Sets up the entire GUI for the typing test.
@@ -441,6 +446,7 @@ class CheckPracticeTyping:
         to create the Check/Practice Typing GUI.
         """
         self.root.title("Check/Practice Typing")
+        self.root.protocol("WM_DELETE_WINDOW", self.quit_app)
 
         # App favicon, comment out when creating .exe with PyInstaller:
         # self.root.iconbitmap("static/icon.ico")
@@ -489,6 +495,15 @@ class CheckPracticeTyping:
                             columnspan=3,
                             pady=(25, 0))
 
+        # Measure upcoming prompts in the test text font, and prepare them while idle.
+        # The first prompt was drawn before there was a font, so it's measured here:
+        measure = Font(font=self.test_text.cget("font")).measure
+        self.session.prompts.measure = measure
+        prompt = self.session.current_prompt
+        self.session.current_prompt = prompt._replace(width=measure(prompt.text))
+        self._show_prompt(self.session.current_prompt)
+        self.root.after_idle(self.session.prompts.refill, self.session.corpus.first)
+
         # Increment row:
         self.increment_row()
 
@@ -503,9 +518,14 @@ class CheckPracticeTyping:
                             column=0,
                             columnspan=3,
                             pady=(50, 0))
-        self.user_text_var.trace_add("write",
-                                     lambda name, index, mode: self.countdown_trigger())
-        self.root.bind("<Return>", self.user_entry)
+
+        # One router owns the typing field's events for the app's lifetime; it diffs
+        # typed text, submits on "Return" and records every keystroke in the
+        # session's ring buffer:
+        self.router = InputRouter(self.root, self.user_text, self.user_text_var)
+        self.router.route(on_text=self._user_text_write,
+                          on_return=self.user_entry,
+                          on_key=self.session.keylog.on_key)
 
         # Increment row:
         self.increment_row()
@@ -513,7 +533,7 @@ class CheckPracticeTyping:
         # User text feedback widget:
         self.user_text_feedback = Label(self.root,
                                         width=50,
-                                        height=2,
+                                        height=3,
                                         font=("Source Sans 3 Black", 12),
                                         fg=self.thumb_color,
                                         text=self.thumb,
@@ -559,7 +579,7 @@ class CheckPracticeTyping:
                                   cursor="trek",
                                   width=8,
                                   height=1,
-                                  command=self.root.quit)
+                                  command=self.quit_app)
         self.exit_button.grid(row=self.current_row,
                               column=1,
                               pady=(65, 0))
@@ -578,6 +598,13 @@ class CheckPracticeTyping:
 
 # Create an instance of `CheckPracticeTyping()` and ENJOY!:
 if __name__ == "__main__":
+    # `python cpt_main.py --instrument latency.json` records latency histograms, see `cpt_instrument.py`:
+    instrumentation = None
+    if sys.argv[1:2] == ["--instrument"] and len(sys.argv) > 2:
+        instrumentation = Instrumentation(sys.argv[2])
+        instrumentation.wrap(CheckPracticeTyping,
+                             "user_entry", "countdown_update", "go_again", "setup_gui")
+
     window = Tk()
     watermark_gui = CheckPracticeTyping(window,
                                         seconds=60,
@@ -585,5 +612,11 @@ if __name__ == "__main__":
                                         gui_h=650,
                                         move_x=100,
                                         move_y=0)
-    window.mainloop()
+    if instrumentation is not None:
+        instrumentation.start_heartbeat(window)
+    try:
+        window.mainloop()
+    finally:
+        if instrumentation is not None:
+            instrumentation.dump()
 
@@ -0,0 +1,185 @@
+"""
+Character n-gram inverted index over the word banks, for targeted drills.
+
+Every prompt of a tier is broken into its distinct lower-case character
+unigrams, bigrams and trigrams, and each n-gram maps to a posting array: the
+sorted ids (indices into the tier) of the prompts that contain it, packed as
+unsigned ints. A drill like "prompts containing 'th', 'ing' or the letter q" is
+then a union of three postings, and "containing both 'th' and 'ing'" an
+intersection, each costing time proportional to the postings involved, never
+a scan of the tier.
+
+Longer n-grams are answered by intersecting the postings of their trigrams and
+checking only the surviving candidates.
+
+Classes:
+    NgramIndex: Inverted index from character n-grams to sorted prompt ids.
+
+Functions:
+    intersect(*postings): Ids present in every sorted posting array.
+    tier_index(name): The n-gram index of a tier, built once per process.
+    union(*postings): Ids present in any sorted posting array.
+"""
+
+# Import Python libraries:
+import bisect
+import heapq
+import threading
+from array import array
+
+# Import project modules:
+from cpt_corpus import load_tier
+
+# Posting arrays hold unsigned ints:
+_ID_TYPE = "I"
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def intersect(*postings) -> array:
+    """
+    Ids present in every sorted posting array.
+
+    Postings are intersected smallest first. Each id of the running result is
+    searched for with a galloping bisect that resumes where the last one ended,
+    so the cost is close to the size of the smallest posting when the others are
+    much larger, and linear in their sizes otherwise.
+
+    Args:
+        *postings (array): Sorted arrays of prompt ids.
+
+    Returns:
+        array: Sorted ids found in all of them.
+    """
+    if not postings:
+        return array(_ID_TYPE)
+    ordered = sorted(postings, key=len)
+    result = array(_ID_TYPE, ordered[0])
+    for posting in ordered[1:]:
+        matched = array(_ID_TYPE)
+        low, size = 0, len(posting)
+        for prompt_id in result:
+            # Gallop to a range holding prompt_id, then bisect within it:
+            step = 1
+            while low + step < size and posting[low + step] < prompt_id:
+                step *= 2
+            low = bisect.bisect_left(posting, prompt_id, low, min(low + step + 1, size))
+            if low == size:
+                break
+            if posting[low] == prompt_id:
+                matched.append(prompt_id)
+        result = matched
+        if not result:
+            break
+    return result
+
+
+def union(*postings) -> array:
+    """
+    Ids present in any sorted posting array.
+
+    Args:
+        *postings (array): Sorted arrays of prompt ids.
+
+    Returns:
+        array: Sorted ids found in at least one of them, without duplicates.
+    """
+    result = array(_ID_TYPE)
+    for prompt_id in heapq.merge(*postings):
+        if not result or result[-1] != prompt_id:
+            result.append(prompt_id)
+    return result
+
+
+class NgramIndex:
+    """
+    Inverted index from character n-grams to sorted prompt ids.
+
+    Attributes:
+        max_n (int): Longest n-gram indexed directly.
+        prompts (Sequence[str]): The indexed prompts; ids are indices into it.
+    """
+
+    def __init__(self, prompts, max_n: int = 3):
+        """
+        Initialize `NgramIndex()` object, indexing every prompt in one pass.
+
+        Args:
+            prompts (Sequence[str]): Prompts to index, e.g. a tier from `cpt_corpus.py`.
+            max_n (int): Longest n-gram indexed directly. Default is 3.
+        """
+        self.prompts = prompts
+        self.max_n = max_n
+        postings = {}
+        # Ids are visited in ascending order, so every posting comes out sorted:
+        for prompt_id, prompt in enumerate(prompts):
+            text = prompt.lower()
+            grams = {text[start:start + n]
+                     for n in range(1, max_n + 1) for start in range(len(text) - n + 1)}
+            for gram in grams:
+                postings.setdefault(gram, array(_ID_TYPE)).append(prompt_id)
+        self._postings = postings
+
+    def __len__(self):
+        return len(self.prompts)
+
+    def postings(self, gram: str) -> array:
+        """
+        Sorted ids of the prompts containing an n-gram, ignoring case.
+
+        Args:
+            gram (str): Any non-empty string. N-grams longer than max_n are
+                resolved from their indexed pieces, then verified.
+
+        Returns:
+            array: Sorted prompt ids.
+        """
+        gram = gram.lower()
+        if len(gram) <= self.max_n:
+            return self._postings.get(gram, array(_ID_TYPE))
+        pieces = {gram[start:start + self.max_n]
+                  for start in range(len(gram) - self.max_n + 1)}
+        candidates = intersect(*(self._postings.get(piece, array(_ID_TYPE)) for piece in pieces))
+        return array(_ID_TYPE, (prompt_id for prompt_id in candidates
+                                if gram in self.prompts[prompt_id].lower()))
+
+    def all_of(self, *grams) -> array:
+        """
+        Sorted ids of the prompts containing every one of the n-grams.
+        """
+        return intersect(*(self.postings(gram) for gram in grams))
+
+    def any_of(self, *grams) -> array:
+        """
+        Sorted ids of the prompts containing at least one of the n-grams.
+        """
+        return union(*(self.postings(gram) for gram in grams))
+
+    def lookup(self, prompt_ids) -> list:
+        """
+        The prompts with the given ids.
+
+        Args:
+            prompt_ids (iterable of int): Ids from a query.
+
+        Returns:
+            list: The prompts, in the order of the ids.
+        """
+        return [self.prompts[prompt_id] for prompt_id in prompt_ids]
+
+
+def tier_index(name: str) -> NgramIndex:
+    """
+    The n-gram index of a tier, built once per process.
+
+    Args:
+        name (str): Tier name, a key of TIER_MODULES in `cpt_corpus.py`.
+
+    Returns:
+        NgramIndex: The tier's index.
+    """
+    with _indexes_lock:
+        if name not in _indexes:
+            _indexes[name] = NgramIndex(load_tier(name))
+        return _indexes[name]
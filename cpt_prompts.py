@@ -0,0 +1,87 @@
+"""
+Prefetched prompt pipeline for use in the Tkinter GUI via cpt_main.py.
+
+Prompts are drawn, tokenized and measured ahead of time, while the Tk loop is
+idle, so handling 'Enter' only has to pop the next prepared prompt.
+
+Variables:
+    Prompt (namedtuple): A prepared prompt: text, words and pixel width.
+
+Classes:
+    PromptQueue: Keeps the next few prompts of the current and next tier ready.
+"""
+
+# Import Python libraries:
+from collections import deque, namedtuple
+
+# Import data from `static` directory:
+from static.cpt_config import TIER_THRESHOLDS
+
+# A prepared prompt. `width` is in pixels, or 0 if no measure function is set:
+Prompt = namedtuple("Prompt", ["text", "words", "width"])
+
+
+class PromptQueue:
+    """
+    Keeps the next few prompts of the current and next tier ready.
+
+    Attributes:
+        depth (int): Number of prompts kept ready per tier.
+        measure (callable): Text to pixel width, e.g. `tkinter.font.Font.measure`.
+        sampler (PromptSampler): Source of prompt text, see `cpt_sampler.py`.
+    """
+
+    def __init__(self, sampler, depth: int = 3, measure=None):
+        """
+        Initialize `PromptQueue()` object.
+
+        Args:
+            sampler (PromptSampler): Source of prompt text.
+            depth (int): Number of prompts kept ready per tier. Default is 3.
+            measure (callable): Text to pixel width. Default is None, no measuring.
+        """
+        self.sampler = sampler
+        self.depth = depth
+        self.measure = measure
+        self._queues = {name: deque() for name in TIER_THRESHOLDS}
+
+    def _prepare(self, tier: str) -> Prompt:
+        """
+        Private method.
+        Draws a prompt from a tier and tokenizes and measures it.
+        """
+        text = self.sampler.draw(tier)
+        width = self.measure(text) if self.measure else 0
+        return Prompt(text, tuple(text.split()), width)
+
+    def pop(self, tier: str) -> Prompt:
+        """
+        Returns the next prompt of a tier, preparing one on the spot if none is ready.
+
+        Args:
+            tier (str): Tier name, a key of TIER_THRESHOLDS.
+
+        Returns:
+            Prompt: The prepared prompt.
+        """
+        queue = self._queues[tier]
+        return queue.popleft() if queue else self._prepare(tier)
+
+    def refill(self, tier: str):
+        """
+        Tops up a tier and the tier after it, meant to run from `after_idle()`.
+
+        The following tier is only topped up once the corpus has finished loading
+        it, so refilling never waits on the prefetch thread.
+
+        Args:
+            tier (str): Tier currently in use.
+        """
+        tiers = list(TIER_THRESHOLDS)
+        upcoming = tiers[tiers.index(tier):tiers.index(tier) + 2]
+        for name in upcoming:
+            if name != tier and not self.sampler.corpus.is_ready(name):
+                continue
+            queue = self._queues[name]
+            while len(queue) < self.depth:
+                queue.append(self._prepare(name))
@@ -0,0 +1,431 @@
+"""
+Batch re-scoring of archived entries, e.g. after the scoring rules change.
+
+Entries are read from the history database (see `cpt_history.py`) in chunks.
+Each chunk is tokenized once, then word and character scores are computed for
+the whole chunk with NumPy array operations:
+
+    - Words: positional matches are one elementwise comparison of padded word-id
+      matrices; out-of-place matches are a sorted intersection of (row, word)
+      keys, the multiset step of `cpt_scoring.score_words()`.
+    - Characters: Myers' bit-parallel edit distance runs on a uint64 per entry,
+      advancing every entry still being typed one character per step. Entries
+      are sorted by typed length, so each only runs its own characters, and a
+      step's character masks come from one sorted lookup of (entry, character)
+      keys. Prompts longer than 64 characters go through
+      `cpt_scoring.edit_distance()`.
+
+The binary round log of cpt_roundlog.py is then regenerated from the rescored
+`rounds` rows, so its trends don't keep reporting the old figures. Run it while
+the app is closed, as the log is replaced whole.
+
+Results are identical to the interactive path in cpt_scoring.py, which is also
+used for every entry when NumPy isn't installed.
+
+`check_equivalence()` verifies that claim on random entries, including empty,
+64-character and longer prompts, on whichever path is active; run it with
+`python cpt_rescore.py --check N`.
+
+Usage:
+    python cpt_rescore.py [--history PATH] [--chunk-size N] [--roundlog PATH | --no-roundlog]
+    python cpt_rescore.py --check N
+
+Variables:
+    BatchScores (namedtuple): Per-entry scores of a batch, as parallel sequences.
+
+Functions:
+    check_equivalence(trials, seed): Compares `score_batch()` with the interactive path.
+    rebuild_roundlog(history_path, roundlog_path, chunk_size): Rewrites the round log.
+    rescore_history(path, chunk_size): Re-scores every entry and round in a database.
+    score_batch(prompts, typed): Word and character scores of (prompt, typed) pairs.
+"""
+
+# Import Python libraries:
+import argparse
+import os
+import random
+import sqlite3
+import sys
+from collections import namedtuple
+
+# NumPy is optional, scoring falls back to the per-entry functions without it:
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Import project modules:
+from cpt_history import DEFAULT_HISTORY_PATH
+from cpt_roundlog import DEFAULT_ROUNDLOG_PATH, RoundLogWriter
+from cpt_scoring import WordScore, edit_distance, score_words
+from cpt_stats import CHARS_PER_WORD
+
+# Per-entry scores of a batch, as parallel sequences:
+BatchScores = namedtuple("BatchScores", ["right", "wrong", "missing", "extra", "distance"])
+
+# Widest prompt the vectorized edit distance handles, one uint64 of bits:
+_WORD_BITS = 64
+# Code points per row in the keys of the pattern masks, one past the largest:
+_CODE_POINTS = 0x110000
+
+
+def _score_batch_python(prompts, typed) -> BatchScores:
+    """
+    Private function.
+    Scores a batch one entry at a time with the interactive functions.
+    """
+    words = [score_words(prompt.split(), text.split()) for prompt, text in zip(prompts, typed)]
+    distances = [edit_distance(prompt, text) for prompt, text in zip(prompts, typed)]
+    return BatchScores(*(list(column) for column in zip(*words)), distances) if words \
+        else BatchScores([], [], [], [], [])
+
+
+def _padded(rows, pad):
+    """
+    Private function.
+    Packs lists of ints into a matrix padded with `pad`, and their lengths.
+    """
+    lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+    matrix = np.full((len(rows), max(int(lengths.max(initial=0)), 1)), pad, dtype=np.int64)
+    flat = np.fromiter((value for row in rows for value in row), dtype=np.int64,
+                       count=int(lengths.sum()))
+    row_index = np.repeat(np.arange(len(rows)), lengths)
+    column_index = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    matrix[row_index, column_index] = flat
+    return matrix, lengths
+
+
+def _score_words_numpy(prompts, typed):
+    """
+    Private function.
+    Vectorized `score_words()` over a batch, returns four count arrays.
+    """
+    # Word ids start at 1; prompts pad with 0 and typed text with -1 so padding never matches:
+    vocab = {}
+    prompt_ids = [[vocab.setdefault(word, len(vocab) + 1) for word in prompt.split()]
+                  for prompt in prompts]
+    typed_ids = [[vocab.setdefault(word, len(vocab) + 1) for word in text.split()]
+                 for text in typed]
+    prompt_matrix, prompt_lengths = _padded(prompt_ids, 0)
+    typed_matrix, typed_lengths = _padded(typed_ids, -1)
+
+    # Words in the same position:
+    width = min(prompt_matrix.shape[1], typed_matrix.shape[1])
+    in_place = prompt_matrix[:, :width] == typed_matrix[:, :width]
+    right = in_place.sum(axis=1)
+
+    # Leftover words on both sides, as (row, word) keys counted like a Counter:
+    stride = len(vocab) + 1
+    rows = np.arange(len(prompts))[:, None] * stride
+
+    def leftover_counts(matrix):
+        left = matrix > 0
+        left[:, :width] &= ~in_place
+        return np.unique((rows + matrix)[left], return_counts=True)
+
+    prompt_keys, prompt_counts = leftover_counts(prompt_matrix)
+    typed_keys, typed_counts = leftover_counts(typed_matrix)
+    common, in_prompt, in_typed = np.intersect1d(prompt_keys, typed_keys,
+                                                 assume_unique=True, return_indices=True)
+    shared = np.minimum(prompt_counts[in_prompt], typed_counts[in_typed])
+    right = right + np.bincount(common // stride, weights=shared,
+                                minlength=len(prompts)).astype(np.int64)
+
+    unmatched_prompt = prompt_lengths - right
+    unmatched_typed = typed_lengths - right
+    wrong = np.minimum(unmatched_prompt, unmatched_typed)
+    return right, wrong, unmatched_prompt - wrong, unmatched_typed - wrong
+
+
+def _flat_code_points(texts):
+    """
+    Private function.
+    Code points of every text, concatenated, with each text's start and length.
+    """
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    chars = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    return chars, np.cumsum(lengths) - lengths, lengths
+
+
+def _pattern_masks(prompts):
+    """
+    Private function.
+    Myers' pattern masks of every prompt, as sorted (row, code point) keys and their masks.
+    """
+    chars, starts, lengths = _flat_code_points(prompts)
+    rows = np.repeat(np.arange(len(prompts), dtype=np.uint64), lengths)
+    positions = np.arange(len(chars), dtype=np.int64) - np.repeat(starts, lengths)
+    keys = rows * _CODE_POINTS + chars
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    bits = np.uint64(1) << positions[order].astype(np.uint64)
+    # Every position of a character in a prompt is one bit of that character's mask:
+    first = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[first], np.bitwise_or.reduceat(bits, first)
+
+
+def _edit_distance_numpy(prompts, typed):
+    """
+    Private function.
+    Vectorized Myers' edit distance over a batch, returns an int64 array.
+
+    Rows are sorted by typed length, longest first, so the rows still being
+    typed at any column are a prefix and each row only runs its own columns.
+    A column's character masks are one sorted lookup of (row, code point) keys.
+    """
+    distances = np.zeros(len(prompts), dtype=np.int64)
+    fits = [i for i, prompt in enumerate(prompts) if 0 < len(prompt) <= _WORD_BITS]
+    fits_set = set(fits)
+    for i, (prompt, text) in enumerate(zip(prompts, typed)):
+        if i not in fits_set:
+            distances[i] = edit_distance(prompt, text)
+    if not fits:
+        return distances
+
+    fits = sorted(fits, key=lambda i: len(typed[i]), reverse=True)
+    prompts = [prompts[i] for i in fits]
+    keys, masks = _pattern_masks(prompts)
+    typed_chars, typed_starts, typed_lengths = _flat_code_points([typed[i] for i in fits])
+    # Rows still typing at each column, a prefix thanks to the sort:
+    active = len(fits) - np.cumsum(np.bincount(typed_lengths, minlength=1))
+
+    one = np.uint64(1)
+    lengths = np.array([len(prompt) for prompt in prompts], dtype=np.uint64)
+    mask = np.where(lengths == _WORD_BITS, np.uint64(0xFFFFFFFFFFFFFFFF),
+                    (one << np.minimum(lengths, _WORD_BITS - 1)) - one)
+    last_bit = one << (lengths - one)
+    row_keys = np.arange(len(fits), dtype=np.uint64) * _CODE_POINTS
+
+    vp, vn = mask.copy(), np.zeros_like(mask)
+    distance = lengths.astype(np.int64)
+    for column in range(int(typed_lengths[0])):
+        rows = int(active[column])
+        wanted = row_keys[:rows] + typed_chars[typed_starts[:rows] + column]
+        found = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        eq = np.where(keys[found] == wanted, masks[found], np.uint64(0))
+        row_vp, row_vn, row_mask = vp[:rows], vn[:rows], mask[:rows]
+        xv = eq | row_vn
+        xh = (((eq & row_vp) + row_vp) ^ row_vp) | eq
+        hp = row_vn | (~(xh | row_vp) & row_mask)
+        hn = row_vp & xh
+        distance[:rows] += (hp & last_bit[:rows]) != 0
+        distance[:rows] -= (hn & last_bit[:rows]) != 0
+        hp = ((hp << one) | one) & row_mask
+        hn = (hn << one) & row_mask
+        vp[:rows] = hn | (~(xv | hp) & row_mask)
+        vn[:rows] = hp & xv
+
+    distances[fits] = distance
+    return distances
+
+
+def score_batch(prompts, typed) -> BatchScores:
+    """
+    Word and character scores of (prompt, typed) pairs.
+
+    Args:
+        prompts (list of str): Prompt of each entry.
+        typed (list of str): Typed text of each entry.
+
+    Returns:
+        BatchScores: Word counts and edit distance of every entry, as NumPy
+            arrays when NumPy is installed, else as lists.
+    """
+    if np is None or not prompts:
+        return _score_batch_python(prompts, typed)
+    return BatchScores(*_score_words_numpy(prompts, typed), _edit_distance_numpy(prompts, typed))
+
+
+def _random_entry(rng: random.Random) -> tuple:
+    """
+    Private function.
+    A random (prompt, typed) pair, with typed a mistyped, shuffled or unrelated version.
+    """
+    words = ["".join(rng.choice("abcdeé'.,") for _ in range(rng.randint(1, 8)))
+             for _ in range(rng.choice((0, 1, 3, 8, 16)))]
+    prompt = " ".join(words)
+    # Prompt lengths around the 64-character boundary of the vectorized path:
+    if rng.random() < 0.2:
+        prompt = (prompt + " " + "x" * 64)[:rng.choice((63, 64, 65))]
+    typed = list(prompt)
+    for _ in range(rng.randint(0, 6)):
+        i = rng.randrange(len(typed) + 1)
+        edit = rng.randrange(3)
+        if edit == 0 and i < len(typed):
+            del typed[i]
+        elif edit == 1:
+            typed.insert(i, rng.choice("abe x"))
+        elif i < len(typed):
+            typed[i] = rng.choice("abe x")
+    typed = "".join(typed)
+    if rng.random() < 0.1:
+        typed = " ".join(rng.sample(prompt.split(), len(prompt.split())))
+    return prompt, typed
+
+
+def check_equivalence(trials: int = 10000, seed: int = 0) -> list:
+    """
+    Compares `score_batch()` with `score_words()` and `edit_distance()` on random entries.
+
+    Args:
+        trials (int): Number of random entries. Default is 10000.
+        seed (int): Seed of the random entries. Default is 0.
+
+    Returns:
+        list: (prompt, typed, batch scores, interactive scores) of every mismatch.
+    """
+    rng = random.Random(seed)
+    entries = [_random_entry(rng) for _ in range(trials)]
+    scores = score_batch([prompt for prompt, _ in entries], [text for _, text in entries])
+    mismatches = []
+    for (prompt, text), *batch in zip(entries, *scores):
+        batch = tuple(int(value) for value in batch)
+        expected = (*score_words(prompt.split(), text.split()), edit_distance(prompt, text))
+        if batch != expected:
+            mismatches.append((prompt, text, batch, expected))
+    return mismatches
+
+
+def _rescore_entries(conn, chunk_size: int) -> int:
+    """
+    Private function.
+    Re-scores the `entries` table chunk by chunk, one transaction per chunk.
+    """
+    count = 0
+    last_key = (-1, -1)
+    while True:
+        rows = conn.execute("SELECT round_id, seq, prompt, typed FROM entries "
+                            "WHERE (round_id, seq) > (?, ?) ORDER BY round_id, seq LIMIT ?",
+                            (*last_key, chunk_size)).fetchall()
+        if not rows:
+            return count
+        round_ids, seqs, prompts, typed = zip(*rows)
+        scores = score_batch(list(prompts), list(typed))
+        updates = [(int(distance == 0), int(right), int(wrong), int(missing), int(extra),
+                    int(distance), round_id, seq)
+                   for right, wrong, missing, extra, distance, round_id, seq
+                   in zip(*scores, round_ids, seqs)]
+        with conn:
+            conn.executemany("UPDATE entries SET correct = ?, words_right = ?, words_wrong = ?, "
+                             "words_missing = ?, words_extra = ?, distance = ? "
+                             "WHERE round_id = ? AND seq = ?", updates)
+        count += len(rows)
+        last_key = rows[-1][:2]
+
+
+def _rescore_rounds(conn):
+    """
+    Private function.
+    Recomputes every round's summary from its entries, as `TypingSession.finish()` does.
+    """
+    totals = conn.execute(
+        "SELECT r.id, r.duration, COUNT(*), SUM(e.correct), SUM(e.words_right), "
+        "SUM(e.words_wrong), SUM(e.words_missing), SUM(length(e.prompt)), "
+        "SUM(MIN(e.distance, length(e.prompt))), SUM(e.distance), SUM(length(e.typed) + 1) "
+        "FROM rounds r JOIN entries e ON e.round_id = r.id GROUP BY r.id").fetchall()
+    updates = []
+    for (round_id, duration, num_entries, user_right, right, wrong, missing,
+         chars_total, char_errors, distance, typed_chars) in totals:
+        word_score = WordScore(right, wrong, missing, 0)
+        entry_accuracy = round(user_right / num_entries * 100) if user_right else 0
+        char_accuracy = round((chars_total - char_errors) / chars_total * 100) if chars_total else 0
+        minutes = duration / 60
+        gross_wpm = typed_chars / CHARS_PER_WORD / minutes if minutes > 0 else 0.0
+        net_wpm = max(0.0, gross_wpm - distance / minutes) if minutes > 0 else 0.0
+        cpm = max(0, typed_chars - distance) / minutes if minutes > 0 else 0.0
+        updates.append((user_right, word_score.right, word_score.total, entry_accuracy,
+                        word_score.accuracy(), char_accuracy, gross_wpm, net_wpm, cpm, round_id))
+    with conn:
+        conn.executemany("UPDATE rounds SET user_right = ?, words_right = ?, total_words = ?, "
+                         "entry_accuracy = ?, word_accuracy = ?, char_accuracy = ?, "
+                         "gross_wpm = ?, net_wpm = ?, cpm = ? WHERE id = ?", updates)
+
+
+def rebuild_roundlog(history_path: str = DEFAULT_HISTORY_PATH,
+                     roundlog_path: str = DEFAULT_ROUNDLOG_PATH, chunk_size: int = 50000) -> int:
+    """
+    Rewrites the binary round log from the `rounds` table, in the order the rounds were saved.
+
+    The log is written to a temporary file first and moved into place, so a
+    reader never sees a half-written log.
+
+    Args:
+        history_path (str): Path of the history database. Default is DEFAULT_HISTORY_PATH.
+        roundlog_path (str): Path of the round log. Default is DEFAULT_ROUNDLOG_PATH.
+        chunk_size (int): Rounds read per query. Default is 50000.
+
+    Returns:
+        int: Number of rounds written.
+    """
+    temp_path = f"{roundlog_path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(history_path)
+    writer = RoundLogWriter(temp_path)
+    try:
+        cursor = conn.execute("SELECT user, finished_at, duration, num_entries, user_right, "
+                              "words_right, total_words, entry_accuracy, word_accuracy, "
+                              "char_accuracy, gross_wpm, net_wpm, cpm FROM rounds ORDER BY id")
+        count = 0
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.append(rows)
+            count += len(rows)
+    finally:
+        writer.close()
+        conn.close()
+    os.replace(temp_path, roundlog_path)
+    return count
+
+
+def rescore_history(path: str = DEFAULT_HISTORY_PATH, chunk_size: int = 50000,
+                    roundlog_path: str = DEFAULT_ROUNDLOG_PATH) -> int:
+    """
+    Re-scores every entry and round in a database, then regenerates the round log.
+
+    Args:
+        path (str): Path of the history database. Default is DEFAULT_HISTORY_PATH.
+        chunk_size (int): Entries scored per batch. Default is 50000.
+        roundlog_path (str): Round log to regenerate, None to leave it as it is.
+            Default is DEFAULT_ROUNDLOG_PATH.
+
+    Returns:
+        int: Number of entries re-scored.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        count = _rescore_entries(conn, chunk_size)
+        _rescore_rounds(conn)
+    finally:
+        conn.close()
+    if roundlog_path is not None:
+        rebuild_roundlog(path, roundlog_path, chunk_size)
+    return count
+
+
+# Re-score the history database from the command line:
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score archived typing entries.")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH,
+                        help="history database to re-score")
+    parser.add_argument("--chunk-size", type=int, default=50000,
+                        help="entries scored per batch")
+    parser.add_argument("--roundlog", default=DEFAULT_ROUNDLOG_PATH,
+                        help="binary round log to regenerate from the re-scored rounds")
+    parser.add_argument("--no-roundlog", action="store_true",
+                        help="leave the round log as it is; its trends go stale")
+    parser.add_argument("--check", type=int, metavar="N",
+                        help="compare batch and interactive scores on N random entries instead")
+    arguments = parser.parse_args()
+    if arguments.check:
+        failures = check_equivalence(arguments.check)
+        for failure in failures[:10]:
+            print("Mismatch: prompt={!r} typed={!r} batch={} interactive={}".format(*failure))
+        print(f"{'NumPy' if np is not None else 'Python'} path: "
+              f"{arguments.check - len(failures)}/{arguments.check} entries identical.")
+        sys.exit(1 if failures else 0)
+    roundlog = None if arguments.no_roundlog else arguments.roundlog
+    print(f"Re-scored {rescore_history(arguments.history, arguments.chunk_size, roundlog)} "
+          f"entries.")
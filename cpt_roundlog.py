@@ -0,0 +1,245 @@
+"""
+Append-only binary round log for long-term analytics.
+
+A second storage backend next to the SQLite history (see `cpt_history.py`):
+every finished round is appended as one fixed-width record of float64 fields,
+the summary columns of the `rounds` table plus a numeric user key. The reader
+`mmap`s the file and exposes each field as a zero-copy strided `memoryview`, or
+as a NumPy array view when NumPy is installed, so a trend over a million rounds
+is one vectorized pass instead of a million row fetches.
+
+The file is little-endian on every platform; the reader only maps it zero-copy
+where that is the native byte order, and converts a copy elsewhere.
+
+Variables:
+    DEFAULT_ROUNDLOG_PATH (str - constant): Log used when no path is given.
+    FIELDS (tuple - constant): Names of the fields of a record, in order.
+
+Classes:
+    RoundLogReader: Memory-mapped, columnar view of a round log.
+    RoundLogWriter: Appends round records to a log file.
+
+Functions:
+    user_key(user): Numeric key of a user name, exact as a float64.
+"""
+
+# Import Python libraries:
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# NumPy is optional, the reader falls back to memoryviews without it:
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Log in the user's home directory:
+DEFAULT_ROUNDLOG_PATH = os.path.join(os.path.expanduser("~"), ".check_practice_typing.rounds")
+
+# Record fields, the `rounds` columns of cpt_history.py with `user` as user_key():
+FIELDS = ("user_key", "finished_at", "duration", "num_entries", "user_right", "words_right",
+          "total_words", "entry_accuracy", "word_accuracy", "char_accuracy",
+          "gross_wpm", "net_wpm", "cpm")
+
+# File header: magic, format version, fields per record, padding to 8-byte alignment.
+_MAGIC = b"CPTR"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHQ")
+_RECORD = struct.Struct(f"<{len(FIELDS)}d")
+
+
+def user_key(user: str) -> float:
+    """
+    Numeric key of a user name, exact as a float64.
+
+    Args:
+        user (str): Name rounds are stored under.
+
+    Returns:
+        float: A 48-bit hash of the name.
+    """
+    digest = hashlib.blake2b(user.encode("utf-8"), digest_size=6).digest()
+    return float(int.from_bytes(digest, "little"))
+
+
+class RoundLogWriter:
+    """
+    Appends round records to a log file.
+
+    Records are only ever appended. A record cut short by a crash is ignored by
+    the reader, and cut off by the next writer before it appends, so later
+    records stay aligned.
+
+    Attributes:
+        path (str): Path of the log file.
+    """
+
+    def __init__(self, path: str = DEFAULT_ROUNDLOG_PATH):
+        """
+        Initialize `RoundLogWriter()` object, writing the header of a new log
+        and dropping a partial record at the end of an existing one.
+
+        Args:
+            path (str): Path of the log file. Default is DEFAULT_ROUNDLOG_PATH.
+
+        Raises:
+            ValueError: If the file exists but is not a round log of the current format.
+        """
+        self.path = path
+        self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        try:
+            size = self._file.seek(0, os.SEEK_END)
+            if size < _HEADER.size:
+                # New, or cut short before its header was complete:
+                self._file.seek(0)
+                self._file.truncate()
+                self._file.write(_HEADER.pack(_MAGIC, _VERSION, len(FIELDS), 0))
+                self._file.flush()
+                return
+            self._file.seek(0)
+            magic, version, fields, _ = _HEADER.unpack(self._file.read(_HEADER.size))
+            if (magic, version, fields) != (_MAGIC, _VERSION, len(FIELDS)):
+                raise ValueError(f"{path} is not a version {_VERSION} round log.")
+            whole = _HEADER.size + (size - _HEADER.size) // _RECORD.size * _RECORD.size
+            if whole != size:
+                self._file.truncate(whole)
+            self._file.seek(whole)
+        except (OSError, ValueError):
+            self._file.close()
+            raise
+
+    def close(self):
+        """
+        Closes the log file.
+        """
+        self._file.close()
+
+    def append(self, round_rows):
+        """
+        Appends rounds and flushes them in one write.
+
+        Args:
+            round_rows (iterable): `rounds` rows from `HistoryStore.round_rows()`.
+        """
+        records = b"".join(_RECORD.pack(user_key(row[0]), *row[1:]) for row in round_rows)
+        self._file.write(records)
+        self._file.flush()
+
+
+class RoundLogReader:
+    """
+    Memory-mapped, columnar view of a round log.
+
+    Attributes:
+        path (str): Path of the log file.
+    """
+
+    def __init__(self, path: str = DEFAULT_ROUNDLOG_PATH):
+        """
+        Initialize `RoundLogReader()` object.
+
+        Args:
+            path (str): Path of the log file. Default is DEFAULT_ROUNDLOG_PATH.
+
+        Raises:
+            ValueError: If the file is not a round log of the current format.
+        """
+        self.path = path
+        with open(path, "rb") as log:
+            self._mmap = mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, fields, _ = _HEADER.unpack_from(self._mmap)
+        if (magic, version, fields) != (_MAGIC, _VERSION, len(FIELDS)):
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {_VERSION} round log.")
+
+        # Whole records only, a trailing partial record is ignored:
+        self._count = (len(self._mmap) - _HEADER.size) // _RECORD.size
+        end = _HEADER.size + self._count * _RECORD.size
+        self._view = memoryview(self._mmap)
+        self._values = self._view[_HEADER.size:end]
+        if sys.byteorder == "little":
+            self._values = self._values.cast("d")
+        else:
+            # The records are little-endian, a big-endian host reads a swapped copy:
+            swapped = array("d", self._values.tobytes())
+            swapped.byteswap()
+            self._values.release()
+            self._values = memoryview(swapped)
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        """
+        Releases the memory map. Columns taken from the reader become unusable.
+        """
+        self._values.release()
+        self._view.release()
+        self._mmap.close()
+
+    def column(self, name: str):
+        """
+        One field of every record, without copying.
+
+        Args:
+            name (str): A name from FIELDS.
+
+        Returns:
+            numpy.ndarray or memoryview: Strided float64 view of the field.
+        """
+        index = FIELDS.index(name)
+        if np is not None:
+            table = np.frombuffer(self._values, dtype=np.float64).reshape(-1, len(FIELDS))
+            return table[:, index]
+        return self._values[index::len(FIELDS)]
+
+    def trend(self, user: str, field: str = "net_wpm", since: float = 0) -> tuple:
+        """
+        Least-squares trend of a user's field over time.
+
+        Args:
+            user (str): Name the rounds are stored under.
+            field (str): A name from FIELDS. Default is "net_wpm".
+            since (float): Unix time to start from. Default is 0, all history.
+
+        Returns:
+            tuple: (rounds, mean, change per day), zeros where undefined.
+        """
+        key = user_key(user)
+        users, times, values = (self.column("user_key"), self.column("finished_at"),
+                                self.column(field))
+        if np is not None:
+            mask = (users == key) & (times >= since)
+            days, values = times[mask] / 86400, values[mask]
+            count = int(mask.sum())
+            if count == 0:
+                return 0, 0.0, 0.0
+            mean = float(values.mean())
+            spread = float(((days - days.mean()) ** 2).sum())
+            if spread == 0:
+                return count, mean, 0.0
+            return count, mean, float(((days - days.mean()) * (values - mean)).sum() / spread)
+
+        # Running sums in a single pass over the memoryviews, with days counted
+        # from the first matching round to keep the sums well conditioned:
+        count = sum_x = sum_y = sum_xx = sum_xy = 0.0
+        origin = None
+        for user_value, time_value, value in zip(users, times, values):
+            if user_value == key and time_value >= since:
+                if origin is None:
+                    origin = time_value
+                day = (time_value - origin) / 86400
+                count += 1
+                sum_x += day
+                sum_y += value
+                sum_xx += day * day
+                sum_xy += day * value
+        if count == 0:
+            return 0, 0.0, 0.0
+        spread = sum_xx - sum_x * sum_x / count
+        slope = (sum_xy - sum_x * sum_y / count) / spread if spread > 1e-12 else 0.0
+        return int(count), sum_y / count, slope
@@ -0,0 +1,84 @@
+"""
+Persistent input event routing for use in the Tkinter GUI via cpt_main.py.
+
+Every `trace_add()` and `bind()` with a Python callable registers a new Tcl
+command, and a new `StringVar` a new Tcl variable; none of them are freed while
+the widget lives. `InputRouter` installs the typing field's write trace, its
+key binding and the 'Enter' binding exactly once, and forwards each event to
+whichever handlers are currently routed. Rounds switch handlers or pause the
+router instead of re-registering anything, so the per-keystroke path and the
+Tcl interpreter's size stay the same however many rounds are played.
+
+Classes:
+    InputRouter: Owns the typing field's input events and dispatches them to handlers.
+"""
+
+
+class InputRouter:
+    """
+    Owns the typing field's input events and dispatches them to handlers.
+
+    Attributes:
+        accepting (bool): Whether 'Enter' is forwarded; typed text and keys always are.
+        entry (Entry): The typing field.
+        on_key (callable): Called with every <KeyPress> event of the entry, else None.
+        on_return (callable): Called with every 'Enter' event while accepting, else None.
+        on_text (callable): Called with no arguments whenever the text changes, else None.
+        variable (StringVar): Text variable of the entry, kept for the router's lifetime.
+    """
+
+    def __init__(self, root, entry, variable):
+        """
+        Initialize `InputRouter()` object and install its trace and bindings.
+
+        Args:
+            root (Tk): Window receiving 'Enter' wherever the focus is.
+            entry (Entry): The typing field.
+            variable (StringVar): Text variable of the entry.
+        """
+        self.entry = entry
+        self.variable = variable
+        self.accepting = True
+        self.on_key = None
+        self.on_return = None
+        self.on_text = None
+        variable.trace_add("write", self._text_written)
+        entry.bind("<KeyPress>", self._key_pressed, add="+")
+        root.bind("<Return>", self._return_pressed)
+
+    def route(self, on_text=None, on_return=None, on_key=None):
+        """
+        Sets the handlers events are dispatched to.
+
+        Args:
+            on_text (callable): Called with no arguments when the text changes.
+            on_return (callable): Called with the 'Enter' event.
+            on_key (callable): Called with every <KeyPress> event.
+        """
+        self.on_text = on_text
+        self.on_return = on_return
+        self.on_key = on_key
+
+    def _text_written(self, *_):
+        """
+        Private method.
+        Write trace of the text variable.
+        """
+        if self.on_text is not None:
+            self.on_text()
+
+    def _key_pressed(self, event):
+        """
+        Private method.
+        <KeyPress> binding of the entry.
+        """
+        if self.on_key is not None:
+            self.on_key(event)
+
+    def _return_pressed(self, event):
+        """
+        Private method.
+        'Enter' binding of the window, ignored while not accepting.
+        """
+        if self.accepting and self.on_return is not None:
+            self.on_return(event)
@@ -0,0 +1,398 @@
+"""
+Non-repeating prompt selection for use in the Tkinter GUI via cpt_main.py.
+
+Each tier is handed out as a lazily shuffled cycle: every prompt is drawn once,
+in random order, before any prompt is drawn again. The shuffle is a sparse
+Fisher-Yates that only records the positions it has swapped, so a draw is O(1)
+and starting a cycle costs nothing, however large the tier.
+
+`WeakWordSampler` additionally favors prompts containing the words the user has
+missed. A prompt's weight is 1 plus a boost per miss of each of its words, so the
+weights split into a uniform part, still served by the shuffled cycle, and a
+sparse boosted part, served by a Vose alias table. Both draws are O(1). Indexing
+a tier's words and rebuilding its alias table happen on a worker thread, and the
+new table is swapped in whole when it's ready, so 'Go again' never waits on them.
+Words found in a large share of a tier aren't boosted, and the boosted set is
+capped, so a rebuild stays small however large the tier. Boosts fade with every
+update, and a full set evicts its lowest boosts, so the set follows the words
+the user is missing now rather than the first ones missed.
+
+Classes:
+    AliasTable: Vose's alias method, O(1) draws from fixed weights.
+    PromptSampler: Shuffled cycles for one app session, one per tier.
+    ShuffledCycle: Lazily shuffled, endlessly repeating cycle over a sequence.
+    WeakWordSampler: PromptSampler biased toward prompts with the user's missed words.
+"""
+
+# Import Python libraries:
+import heapq
+import random
+import string
+import threading
+from array import array
+from collections import Counter, deque
+from operator import itemgetter
+
+# Import data from `static` directory:
+from static.cpt_config import TIER_THRESHOLDS
+
+# Share of a tier's prompts above which a word is too common to boost, and its floor:
+_COMMON_SHARE, _COMMON_MIN = 0.02, 32
+# Most prompts of a tier that carry a boost:
+_MAX_BOOSTED = 10000
+# Factor applied to earlier misses at every update, and the boost below which one is dropped:
+_DECAY = 0.9
+_MIN_BOOST = 0.05
+
+
+class ShuffledCycle:
+    """
+    Lazily shuffled, endlessly repeating cycle over a sequence.
+
+    Attributes:
+        prompts (Sequence[str]): The sequence being cycled through.
+    """
+
+    def __init__(self, prompts, rng: random.Random = None):
+        """
+        Initialize `ShuffledCycle()` object.
+
+        Args:
+            prompts (Sequence[str]): Non-empty sequence to draw from.
+            rng (random.Random): Source of randomness. Default is a new `Random()`.
+        """
+        self.prompts = prompts
+        self._rng = rng or random.Random()
+        # Sparse permutation: position -> index, only for swapped positions.
+        self._swaps = {}
+        self._drawn = 0
+        self._last = None
+
+    def draw_index(self) -> int:
+        """
+        Returns the index of the next prompt in the cycle.
+
+        A new cycle starts once every index has been drawn, and its first index
+        is never the last index of the previous cycle.
+
+        Returns:
+            int: Index into `prompts`.
+        """
+        size = len(self.prompts)
+        if self._drawn >= size:
+            self._swaps.clear()
+            self._drawn = 0
+
+        position = self._drawn
+        swap = self._rng.randrange(position, size)
+        if position == 0 and swap == self._last and size > 1:
+            swap = (swap + self._rng.randrange(1, size)) % size
+
+        # Fisher-Yates step: take the index at `swap`, move the one at `position` there:
+        index = self._swaps.get(swap, swap)
+        self._swaps[swap] = self._swaps.get(position, position)
+        self._swaps.pop(position, None)
+
+        self._drawn += 1
+        self._last = index
+        return index
+
+    def draw(self) -> str:
+        """
+        Returns the next prompt in the cycle.
+        """
+        return self.prompts[self.draw_index()]
+
+
+class PromptSampler:
+    """
+    Shuffled cycles for one app session, one per tier.
+
+    Cycles are created the first time a tier is drawn from and survive
+    'Go again', so within a session a whole tier is worked through before any
+    prompt repeats. They're kept in memory only: a new session, or another
+    user, starts fresh cycles.
+
+    Attributes:
+        corpus (CorpusLoader): Source of the tiers.
+    """
+
+    def __init__(self, corpus, rng: random.Random = None):
+        """
+        Initialize `PromptSampler()` object.
+
+        Args:
+            corpus (CorpusLoader): Source of the tiers, see `cpt_corpus.py`.
+            rng (random.Random): Source of randomness. Default is a new `Random()`.
+        """
+        self.corpus = corpus
+        self._rng = rng or random.Random()
+        self._cycles = {}
+
+    def record(self, prompt_words, typed_words):
+        """
+        Takes note of a submitted entry. Does nothing here, see `WeakWordSampler`.
+
+        Args:
+            prompt_words (tuple): Words of the entry's prompt.
+            typed_words (list): Words the user typed.
+        """
+
+    def update(self):
+        """
+        Applies what `record()` noted, between rounds. Does nothing here.
+        """
+
+    def draw(self, tier: str) -> str:
+        """
+        Returns the next prompt from a tier.
+
+        Args:
+            tier (str): Tier name, a key of TIER_THRESHOLDS.
+
+        Returns:
+            str: A prompt not drawn since the tier's cycle last restarted.
+        """
+        cycle = self._cycles.get(tier)
+        if cycle is None:
+            cycle = self._cycles[tier] = ShuffledCycle(self.corpus.get(tier), self._rng)
+        return cycle.draw()
+
+
+class AliasTable:
+    """
+    Vose's alias method, O(1) draws from fixed weights.
+
+    Attributes:
+        total (float): Sum of the weights.
+    """
+
+    def __init__(self, weights):
+        """
+        Initialize `AliasTable()` object in O(n).
+
+        Args:
+            weights (Sequence[float]): Non-negative weights, not all zero.
+        """
+        size = len(weights)
+        self.total = float(sum(weights))
+        self._prob = array("d", (weight * size / self.total for weight in weights))
+        self._alias = array("I", range(size))
+        small = [i for i, prob in enumerate(self._prob) if prob < 1.0]
+        large = [i for i, prob in enumerate(self._prob) if prob >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._alias[less] = more
+            self._prob[more] -= 1.0 - self._prob[less]
+            (small if self._prob[more] < 1.0 else large).append(more)
+        # Whatever is left is 1 up to rounding error:
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def __len__(self):
+        return len(self._prob)
+
+    def draw(self, rng: random.Random) -> int:
+        """
+        Returns an index with probability proportional to its weight.
+
+        Args:
+            rng (random.Random): Source of randomness.
+
+        Returns:
+            int: Index into the weights.
+        """
+        i = rng.randrange(len(self._prob))
+        return i if rng.random() < self._prob[i] else self._alias[i]
+
+
+def _token(word: str) -> str:
+    """
+    Private function.
+    Case- and punctuation-insensitive form of a word.
+    """
+    return word.strip(string.punctuation).lower()
+
+
+class _WeakTier:
+    """
+    Private class.
+    Boosts and alias table of one tier, with the tier's word-to-prompts index.
+
+    Only the worker thread changes it; `snapshot` is replaced whole, so the
+    drawing thread always sees a matching pair of ids and table.
+    """
+
+    def __init__(self, prompts):
+        """
+        Initialize `_WeakTier()` object, indexing every prompt's distinct words
+        except the ones too common to boost.
+        """
+        postings = {}
+        for prompt_id, prompt in enumerate(prompts):
+            for token in {_token(word) for word in prompt.split()}:
+                postings.setdefault(token, array("I")).append(prompt_id)
+        common = max(_COMMON_MIN, int(len(prompts) * _COMMON_SHARE))
+        self.postings = {token: ids for token, ids in postings.items() if len(ids) <= common}
+        self.size = len(prompts)
+        self.boosts = {}
+        self.snapshot = None
+        self.last = None
+
+    def add(self, misses: Counter, boost: float):
+        """
+        Fades the existing boosts and adds the boost of new misses to the prompts
+        containing them. Past _MAX_BOOSTED prompts, the newly boosted ones are
+        kept first and the highest of the older ones fill the rest, so a full
+        set still takes in the latest misses. Then rebuilds the alias table.
+        """
+        if not misses:
+            return
+        boosts = {prompt_id: value * _DECAY for prompt_id, value in self.boosts.items()
+                  if value * _DECAY >= _MIN_BOOST * boost}
+        fresh = {}
+        for token, count in misses.items():
+            for prompt_id in self.postings.get(token, ()):
+                fresh[prompt_id] = fresh.get(prompt_id, boosts.get(prompt_id, 0.0)) + boost * count
+        boosts.update(fresh)
+        if len(boosts) > _MAX_BOOSTED:
+            if len(fresh) > _MAX_BOOSTED:
+                fresh = dict(heapq.nlargest(_MAX_BOOSTED, fresh.items(), key=itemgetter(1)))
+            older = heapq.nlargest(_MAX_BOOSTED - len(fresh),
+                                   ((prompt_id, value) for prompt_id, value in boosts.items()
+                                    if prompt_id not in fresh), key=itemgetter(1))
+            boosts = {**dict(older), **fresh}
+        self.boosts = boosts
+        if boosts:
+            self.snapshot = (array("I", boosts), AliasTable(list(boosts.values())))
+        else:
+            self.snapshot = None
+
+
+class WeakWordSampler(PromptSampler):
+    """
+    PromptSampler biased toward prompts with the user's missed words.
+
+    A prompt that contains missed words has weight `1 + boost * misses`, summed
+    over its distinct words, with each miss counting _DECAY times less at every
+    later update; every other prompt has weight 1. A draw picks the
+    uniform part with probability `size / (size + boosts)` and takes the next
+    prompt of the shuffled cycle, else it draws from the alias table of boosted
+    prompts. Misses noted during a round are handed to a worker thread at the
+    next `update()`, and take effect once it has swapped in the new tables. Like
+    the cycles, misses last for the app session only.
+
+    Attributes:
+        boost (float): Weight added to a prompt per miss of one of its words.
+        misses (Counter): Times each word has been missed, lower-cased and unpunctuated.
+    """
+
+    def __init__(self, corpus, rng: random.Random = None, boost: float = 1.0):
+        """
+        Initialize `WeakWordSampler()` object.
+
+        Args:
+            corpus (CorpusLoader): Source of the tiers, see `cpt_corpus.py`.
+            rng (random.Random): Source of randomness. Default is a new `Random()`.
+            boost (float): Weight added per miss of a word. Default is 1.0.
+        """
+        super().__init__(corpus, rng)
+        self.boost = boost
+        self.misses = Counter()
+        self._pending = Counter()
+        self._weak = {}
+        # Misses handed to the worker but not yet applied, and the worker itself:
+        self._batches = deque()
+        self._applied = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, prompt_words, typed_words):
+        """
+        Notes the prompt words an entry didn't match, ignoring case and punctuation.
+
+        Args:
+            prompt_words (tuple): Words of the entry's prompt.
+            typed_words (list): Words the user typed.
+        """
+        missed = Counter(map(_token, prompt_words)) - Counter(map(_token, typed_words))
+        missed.pop("", None)
+        self._pending.update(missed)
+
+    def update(self):
+        """
+        Hands the misses noted since the last update to the worker thread.
+
+        Returns at once; draws keep using the current tables until the worker
+        swaps in new ones. See `join()` to wait for it.
+        """
+        if not self._pending:
+            return
+        self.misses.update(self._pending)
+        with self._lock:
+            self._batches.append(self._pending)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._apply_batches,
+                                                name="cpt-weak-words", daemon=True)
+                self._thread.start()
+        self._pending = Counter()
+
+    def join(self):
+        """
+        Waits until the misses handed over so far have been applied.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _apply_batches(self):
+        """
+        Private method.
+        Thread target, applies handed-over misses to every loaded tier until none are left.
+
+        A tier is indexed the first time there are misses to apply to it; after
+        that, a batch costs the posting lists of its words plus the number of
+        boosted prompts.
+        """
+        while True:
+            with self._lock:
+                if not self._batches:
+                    self._thread = None
+                    return
+                batch = Counter()
+                while self._batches:
+                    batch.update(self._batches.popleft())
+            self._applied = Counter({token: count * _DECAY for token, count in self._applied.items()
+                                     if count * _DECAY >= _MIN_BOOST})
+            self._applied.update(batch)
+            for tier in TIER_THRESHOLDS:
+                if tier in self._weak:
+                    self._weak[tier].add(batch, self.boost)
+                elif self.corpus.is_ready(tier):
+                    weak = _WeakTier(self.corpus.get(tier))
+                    weak.add(self._applied, self.boost)
+                    self._weak[tier] = weak
+
+    def draw(self, tier: str) -> str:
+        """
+        Returns a prompt from a tier, favoring prompts with missed words.
+
+        Args:
+            tier (str): Tier name, a key of TIER_THRESHOLDS.
+
+        Returns:
+            str: The prompt.
+        """
+        weak = self._weak.get(tier)
+        snapshot = weak and weak.snapshot
+        if snapshot is None:
+            return super().draw(tier)
+        ids, table = snapshot
+        if self._rng.random() * (weak.size + table.total) < weak.size:
+            return super().draw(tier)
+        prompt_id = ids[table.draw(self._rng)]
+        # Don't show the same weak prompt twice in a row:
+        if prompt_id == weak.last:
+            return super().draw(tier)
+        weak.last = prompt_id
+        return self.corpus.get(tier)[prompt_id]
@@ -0,0 +1,632 @@
+"""
+Entry scoring for use in the Tkinter GUI via cpt_main.py.
+
+Prompt words are aligned to typed words first by position, then as multisets, so
+each typed word can match at most one prompt word. Both passes are linear in the
+number of words.
+
+Characters are scored with Myers' bit-parallel edit distance: one column of the
+Levenshtein table is held as bit vectors in a Python int, so a prompt of up to
+64 characters costs a handful of machine-word operations per typed character.
+
+While the user types, `LiveDiff` keeps its state up to date keystroke by
+keystroke: the length of the correctly typed prefix, so the first error is known
+immediately, one Myers column per typed character, and the word alignment of
+every word completed by a space. When 'Enter' is pressed only the last word is
+left to align, and the character alignment is a traceback over columns already
+computed.
+
+`check_alignment()` compares the bit-parallel results with the textbook
+dynamic-programming table on random strings, and `check_live_diff()` compares
+`LiveDiff` after random edits with scoring the buffer from scratch; run both
+with `python cpt_scoring.py --check N`.
+
+Classes:
+    CharScore: Edit distance and character alignment of one entry.
+    LiveDiff: Incremental match state of the typed buffer against a prompt.
+    WordScore: Right, wrong, missing and extra word counts for one or more entries.
+
+Functions:
+    align_chars(prompt, typed): Edit distance and per-character alignment.
+    check_alignment(trials, seed): Compares `align_chars()` with a reference edit table.
+    check_live_diff(trials, seed): Compares `LiveDiff` with scoring every buffer from scratch.
+    edit_distance(prompt, typed): Levenshtein distance between two strings.
+    score_words(prompt_words, typed_words): Aligns typed words to prompt words.
+"""
+
+# Import Python libraries:
+import argparse
+import random
+import re
+import sys
+from collections import Counter, namedtuple
+from itertools import zip_longest
+
+
+# A typed word completed by the whitespace after it, and whitespace itself:
+_COMPLETED_WORD = re.compile(r"\S+(?=\s)")
+_SPACE = re.compile(r"\s")
+
+
+class WordScore(namedtuple("WordScore", ["right", "wrong", "missing", "extra"])):
+    """
+    Right, wrong, missing and extra word counts for one or more entries.
+
+    `+` adds two scores field by field, so a round's total is the sum of its
+    entries' scores.
+
+    Attributes:
+        right (int): Prompt words typed correctly.
+        wrong (int): Prompt words typed as some other word.
+        missing (int): Prompt words with no typed counterpart.
+        extra (int): Typed words with no prompt counterpart.
+    """
+
+    __slots__ = ()
+
+    def __add__(self, other):
+        return WordScore(*(mine + theirs for mine, theirs in zip(self, other)))
+
+    @property
+    def total(self) -> int:
+        """
+        Number of prompt words scored.
+        """
+        return self.right + self.wrong + self.missing
+
+    def accuracy(self) -> int:
+        """
+        Percentage of prompt words typed correctly, rounded to a whole number.
+        """
+        if self.right == 0:
+            return 0
+        return round(self.right / self.total * 100)
+
+
+def score_words(prompt_words, typed_words) -> WordScore:
+    """
+    Aligns typed words to prompt words.
+
+    Words in the same position match first. The words left over on both sides
+    are then matched as multisets, so a word typed out of place still counts but a
+    repeated prompt word only counts as often as it was typed. Whatever is still
+    unmatched pairs off as wrong words, and the surplus on either side is
+    missing or extra.
+
+    Args:
+        prompt_words (Sequence[str]): Words of the prompt.
+        typed_words (Sequence[str]): Words the user typed.
+
+    Returns:
+        WordScore: The counts for this entry.
+    """
+    right = 0
+    prompt_left = Counter()
+    typed_left = Counter()
+    for prompt_word, typed_word in zip_longest(prompt_words, typed_words):
+        if prompt_word == typed_word:
+            right += 1
+            continue
+        if prompt_word is not None:
+            prompt_left[prompt_word] += 1
+        if typed_word is not None:
+            typed_left[typed_word] += 1
+
+    # Out-of-place words, counted at most as often as they appear on both sides:
+    right += sum((prompt_left & typed_left).values())
+
+    unmatched_prompt = len(prompt_words) - right
+    unmatched_typed = len(typed_words) - right
+    wrong = min(unmatched_prompt, unmatched_typed)
+    return WordScore(right, wrong, unmatched_prompt - wrong, unmatched_typed - wrong)
+
+
+class CharScore(namedtuple("CharScore", ["distance", "length", "alignment"])):
+    """
+    Edit distance and character alignment of one entry.
+
+    The alignment has one symbol per aligned position: "=" for a matching
+    character, "~" for a substituted one, "-" for a prompt character that wasn't
+    typed and "+" for an extra typed character.
+
+    Attributes:
+        distance (int): Levenshtein distance between prompt and typed text.
+        length (int): Number of characters in the prompt.
+        alignment (str): Alignment symbols, in prompt order.
+    """
+
+    __slots__ = ()
+
+    @property
+    def errors(self) -> int:
+        """
+        Character errors charged to the prompt, at most its length.
+        """
+        return min(self.distance, self.length)
+
+
+def _pattern_masks(prompt: str) -> dict:
+    """
+    Private function.
+    Bit mask of the positions of each character in the prompt.
+    """
+    peq = {}
+    for i, char in enumerate(prompt):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    return peq
+
+
+def _myers_step(eq: int, vp: int, vn: int, mask: int):
+    """
+    Private function.
+    Advances Myers' vertical delta vectors by one typed character, given its prompt mask.
+
+    Returns the new (VP, VN) and the horizontal (HP, HN) vectors before shifting.
+    """
+    xv = eq | vn
+    xh = (((eq & vp) + vp) ^ vp) | eq
+    hp = vn | (~(xh | vp) & mask)
+    hn = vp & xh
+    # Shift in a +1 horizontal delta, row 0 of the table grows by one per column:
+    shifted_hp = ((hp << 1) | 1) & mask
+    shifted_hn = (hn << 1) & mask
+    return shifted_hn | (~(xv | shifted_hp) & mask), shifted_hp & xv, hp, hn
+
+
+def _myers_columns(prompt: str, typed: str, keep_columns: bool = False):
+    """
+    Private function.
+    Runs Myers' bit-parallel algorithm with `prompt` as the pattern.
+
+    Bit i of the vertical delta vectors describes row i + 1 of the current column
+    of the edit table. Returns the distance and, if `keep_columns` is set, the
+    (VP, VN) vectors of every column for traceback.
+    """
+    length = len(prompt)
+    mask = (1 << length) - 1
+    last_bit = 1 << (length - 1)
+    peq = _pattern_masks(prompt)
+
+    vp, vn, distance = mask, 0, length
+    columns = [(vp, vn)] if keep_columns else None
+    for char in typed:
+        vp, vn, hp, hn = _myers_step(peq.get(char, 0), vp, vn, mask)
+        if hp & last_bit:
+            distance += 1
+        elif hn & last_bit:
+            distance -= 1
+        if keep_columns:
+            columns.append((vp, vn))
+    return distance, columns
+
+
+def _cell(columns: list, row: int, column: int) -> int:
+    """
+    Private function.
+    Value of one cell of the edit table, from the vertical deltas of its column.
+    """
+    vp, vn = columns[column]
+    below = (1 << row) - 1
+    return column + (vp & below).bit_count() - (vn & below).bit_count()
+
+
+def _traceback(prompt: str, typed: str, columns: list) -> str:
+    """
+    Private function.
+    Alignment symbols of an optimal alignment, traced back through the kept columns.
+    """
+    row, column = len(prompt), len(typed)
+    here = _cell(columns, row, column)
+    symbols = []
+    while row or column:
+        # The current cell's value is carried along, so each step reads at most two cells:
+        if row and column:
+            mismatch = prompt[row - 1] != typed[column - 1]
+            diagonal = _cell(columns, row - 1, column - 1)
+            if diagonal + mismatch == here:
+                symbols.append("~" if mismatch else "=")
+                row, column, here = row - 1, column - 1, diagonal
+                continue
+        if row:
+            above = _cell(columns, row - 1, column)
+            if above + 1 == here:
+                symbols.append("-")
+                row, here = row - 1, above
+                continue
+        symbols.append("+")
+        column, here = column - 1, here - 1
+    return "".join(reversed(symbols))
+
+
+def edit_distance(prompt: str, typed: str) -> int:
+    """
+    Levenshtein distance between two strings.
+
+    Args:
+        prompt (str): Text the user was asked to type.
+        typed (str): Text the user typed.
+
+    Returns:
+        int: Minimum number of insertions, deletions and substitutions.
+    """
+    if not prompt:
+        return len(typed)
+    return _myers_columns(prompt, typed)[0]
+
+
+def align_chars(prompt: str, typed: str) -> CharScore:
+    """
+    Edit distance and per-character alignment.
+
+    The bit vectors of every column are kept, and any cell of the edit table is
+    recovered from them with two popcounts, so the traceback never builds the
+    full table.
+
+    Args:
+        prompt (str): Text the user was asked to type.
+        typed (str): Text the user typed.
+
+    Returns:
+        CharScore: Distance, prompt length and alignment.
+    """
+    if not prompt:
+        return CharScore(len(typed), 0, "+" * len(typed))
+    distance, columns = _myers_columns(prompt, typed, keep_columns=True)
+    return CharScore(distance, len(prompt), _traceback(prompt, typed, columns))
+
+
+def _reference_distance(prompt: str, typed: str) -> int:
+    """
+    Private function.
+    Levenshtein distance from the full Wagner-Fischer table, one row at a time.
+    """
+    previous = list(range(len(typed) + 1))
+    for row, prompt_char in enumerate(prompt, 1):
+        current = [row]
+        for column, typed_char in enumerate(typed, 1):
+            current.append(min(previous[column] + 1, current[column - 1] + 1,
+                               previous[column - 1] + (prompt_char != typed_char)))
+        previous = current
+    return previous[-1]
+
+
+def _alignment_errors(prompt: str, typed: str, score: CharScore):
+    """
+    Private function.
+    Why an alignment doesn't describe an edit of prompt into typed at its distance, or None.
+    """
+    row = column = 0
+    for symbol in score.alignment:
+        if symbol == "=" and prompt[row:row + 1] != typed[column:column + 1]:
+            return f"'=' pairs {prompt[row:row + 1]!r} with {typed[column:column + 1]!r}"
+        row += symbol in "=~-"
+        column += symbol in "=~+"
+    if (row, column) != (len(prompt), len(typed)):
+        return "alignment doesn't cover both strings"
+    if sum(symbol != "=" for symbol in score.alignment) != score.distance:
+        return "alignment cost differs from the distance"
+    return None
+
+
+def check_alignment(trials: int = 10000, seed: int = 0) -> list:
+    """
+    Compares `align_chars()` and `edit_distance()` with a reference edit table.
+
+    Random pairs of strings, up to 80 characters so both sides of a 64-bit word
+    are covered, are scored both ways; every alignment must also be a valid edit
+    of the prompt into the typed text at the reported distance.
+
+    Args:
+        trials (int): Number of random pairs. Default is 10000.
+        seed (int): Seed of the random pairs. Default is 0.
+
+    Returns:
+        list: (prompt, typed, problem) of every failure.
+    """
+    rng = random.Random(seed)
+    failures = []
+    for _ in range(trials):
+        prompt = "".join(rng.choice("abc d") for _ in range(rng.randint(0, 80)))
+        typed = "".join(char for char in prompt if rng.random() > 0.1)
+        typed = "".join(rng.choice("abc d") if rng.random() < 0.1 else char for char in typed)
+        if rng.random() < 0.1:
+            typed = "".join(rng.choice("abc d") for _ in range(rng.randint(0, 80)))
+        expected = _reference_distance(prompt, typed)
+        score = align_chars(prompt, typed)
+        if score.distance != expected or edit_distance(prompt, typed) != expected:
+            failures.append((prompt, typed, f"distance {score.distance}, expected {expected}"))
+        elif _alignment_errors(prompt, typed, score):
+            failures.append((prompt, typed, _alignment_errors(prompt, typed, score)))
+    return failures
+
+
+def _common_prefix(old: str, new: str) -> int:
+    """
+    Private function.
+    Length of the common prefix of the previous and the current buffer.
+    """
+    # Typing and backspacing only change the end of the buffer:
+    if new.startswith(old):
+        return len(old)
+    if old.startswith(new):
+        return len(new)
+    common = 0
+    while old[common] == new[common]:
+        common += 1
+    return common
+
+
+class LiveDiff:
+    """
+    Incremental match state of the typed buffer against a prompt.
+
+    `update()` is called with the whole buffer on every keystroke. Only the part
+    of the buffer that changed since the previous call is diffed: the matching
+    prefix, the Myers columns and the aligned words before the change are kept,
+    and the state is extended over the new characters. Typing or backspacing at
+    the end of the buffer costs O(1) Python-level work, plus aligning one word
+    whenever a space completes it.
+
+    Attributes:
+        matched (int): Length of the typed prefix that matches the prompt.
+        prompt (str): Text the user was asked to type.
+        prompt_words (tuple): Words of the prompt.
+        typed (str): Buffer as of the last `update()`.
+    """
+
+    def __init__(self, prompt: str = "", prompt_words: tuple = None):
+        """
+        Initialize `LiveDiff()` object.
+
+        Args:
+            prompt (str): Text the user was asked to type. Default is "".
+            prompt_words (tuple): Pre-split words of the prompt. Default is None, split here.
+        """
+        self.prompt = ""
+        self.prompt_words = ()
+        self.typed = ""
+        self.matched = 0
+        self.reset(prompt, prompt_words)
+
+    def reset(self, prompt: str, prompt_words: tuple = None):
+        """
+        Starts diffing against a new prompt with an empty buffer.
+
+        Args:
+            prompt (str): Text the user was asked to type.
+            prompt_words (tuple): Pre-split words of the prompt. Default is None, split here.
+        """
+        self.prompt = prompt
+        self.prompt_words = tuple(prompt.split()) if prompt_words is None else prompt_words
+        self.typed = ""
+        self.matched = 0
+        # Myers state, one (VP, VN) column per typed character plus the initial one:
+        self._peq = _pattern_masks(prompt)
+        self._mask = (1 << len(prompt)) - 1
+        self._columns = [(self._mask, 0)]
+        # Positional and multiset word alignment of the completed words, as in
+        # `score_words()`; `_completed` holds (end, prompt word, typed word) to undo them:
+        self._completed = []
+        self._right = 0
+        self._prompt_left = Counter()
+        self._typed_left = Counter()
+        self._overlap = 0
+
+    def update(self, typed: str):
+        """
+        Brings the match state up to date with the current buffer.
+
+        Args:
+            typed (str): Whole contents of the entry widget.
+
+        Returns:
+            int or None: Index of the first error, see `first_error`.
+        """
+        common = _common_prefix(self.typed, typed)
+
+        # The matching prefix only moves past what's unchanged:
+        matched = min(self.matched, common)
+        limit = min(len(typed), len(self.prompt))
+        while matched < limit and typed[matched] == self.prompt[matched]:
+            matched += 1
+
+        # One Myers column per new character, after the unchanged ones:
+        columns = self._columns
+        del columns[common + 1:]
+        vp, vn = columns[-1]
+        for char in typed[common:]:
+            vp, vn, _, _ = _myers_step(self._peq.get(char, 0), vp, vn, self._mask)
+            columns.append((vp, vn))
+
+        # Words whose closing whitespace changed are undone, words newly closed are aligned:
+        while self._completed and self._completed[-1][0] >= common:
+            _, prompt_word, typed_word = self._completed.pop()
+            self._unpair(prompt_word, typed_word)
+        if _SPACE.search(typed, common):
+            for word in _COMPLETED_WORD.finditer(typed, self._scan_from()):
+                prompt_word = self._prompt_word(len(self._completed))
+                self._pair(prompt_word, word.group())
+                self._completed.append((word.end(), prompt_word, word.group()))
+
+        self.typed = typed
+        self.matched = matched
+        return self.first_error
+
+    def _scan_from(self) -> int:
+        """
+        Private method.
+        Index after the whitespace closing the last completed word.
+        """
+        return self._completed[-1][0] + 1 if self._completed else 0
+
+    def _prompt_word(self, position: int):
+        """
+        Private method.
+        Prompt word at a word position, None past the end.
+        """
+        return self.prompt_words[position] if position < len(self.prompt_words) else None
+
+    def _pair(self, prompt_word, typed_word):
+        """
+        Private method.
+        Aligns a prompt word and a typed word at the same position, either may be None.
+        """
+        if prompt_word == typed_word:
+            self._right += 1
+            return
+        # The multiset overlap grows when a side catches up with the other:
+        if prompt_word is not None:
+            if self._prompt_left[prompt_word] < self._typed_left[prompt_word]:
+                self._overlap += 1
+            self._prompt_left[prompt_word] += 1
+        if typed_word is not None:
+            if self._typed_left[typed_word] < self._prompt_left[typed_word]:
+                self._overlap += 1
+            self._typed_left[typed_word] += 1
+
+    def _unpair(self, prompt_word, typed_word):
+        """
+        Private method.
+        Undoes `_pair()` of the same words.
+        """
+        if prompt_word == typed_word:
+            self._right -= 1
+            return
+        if typed_word is not None:
+            self._typed_left[typed_word] -= 1
+            if self._typed_left[typed_word] < self._prompt_left[typed_word]:
+                self._overlap -= 1
+        if prompt_word is not None:
+            self._prompt_left[prompt_word] -= 1
+            if self._prompt_left[prompt_word] < self._typed_left[prompt_word]:
+                self._overlap -= 1
+
+    @property
+    def first_error(self):
+        """
+        Index of the first typed character that doesn't match, or None.
+        """
+        return self.matched if self.matched < len(self.typed) else None
+
+    @property
+    def is_exact(self) -> bool:
+        """
+        True when the buffer is exactly the prompt.
+        """
+        return self.matched == len(self.prompt) == len(self.typed)
+
+    def word_score(self) -> WordScore:
+        """
+        Word counts for the current buffer, the same as `score_words()` gives.
+
+        Free when the buffer matches exactly; otherwise only the last, unfinished
+        word and any prompt words not yet reached are aligned, and then undone.
+        """
+        if self.is_exact:
+            return WordScore(len(self.prompt_words), 0, 0, 0)
+        position = len(self._completed)
+        pairs = [(self._prompt_word(position + i), word)
+                 for i, word in enumerate(self.typed[self._scan_from():].split())]
+        typed_count = position + len(pairs)
+        pairs += [(prompt_word, None) for prompt_word in self.prompt_words[typed_count:]]
+        for prompt_word, typed_word in pairs:
+            self._pair(prompt_word, typed_word)
+        right = self._right + self._overlap
+        for prompt_word, typed_word in reversed(pairs):
+            self._unpair(prompt_word, typed_word)
+
+        unmatched_prompt = len(self.prompt_words) - right
+        unmatched_typed = typed_count - right
+        wrong = min(unmatched_prompt, unmatched_typed)
+        return WordScore(right, wrong, unmatched_prompt - wrong, unmatched_typed - wrong)
+
+    def char_score(self) -> CharScore:
+        """
+        Edit distance and alignment for the current buffer.
+
+        The columns were computed keystroke by keystroke, so the distance is two
+        popcounts and the alignment a traceback through them.
+        """
+        if not self.prompt:
+            return CharScore(len(self.typed), 0, "+" * len(self.typed))
+        if self.is_exact:
+            return CharScore(0, len(self.prompt), "=" * len(self.prompt))
+        distance = _cell(self._columns, len(self.prompt), len(self.typed))
+        return CharScore(distance, len(self.prompt),
+                         _traceback(self.prompt, self.typed, self._columns))
+
+
+# Check the bit-parallel scoring against the reference table from the command line:
+def _first_mismatch(prompt: str, typed: str):
+    """
+    Private function.
+    Index of the first typed character that doesn't match the prompt, or None.
+    """
+    for index, char in enumerate(typed):
+        if index >= len(prompt) or char != prompt[index]:
+            return index
+    return None
+
+
+def check_live_diff(trials: int = 10000, seed: int = 0) -> list:
+    """
+    Compares `LiveDiff` with scoring every buffer from scratch.
+
+    Each trial types a random prompt of short words with mistakes, backspaces,
+    and insertions and deletions in the middle of the buffer. After every edit
+    `word_score()`, `char_score().distance` and `first_error` must equal
+    `score_words()`, `edit_distance()` and a plain prefix scan of the buffer.
+
+    Args:
+        trials (int): Number of random typing sessions. Default is 10000.
+        seed (int): Seed of the random sessions. Default is 0.
+
+    Returns:
+        list: (prompt, typed, problem) of every failure, at most one per session.
+    """
+    rng = random.Random(seed)
+    failures = []
+    for _ in range(trials):
+        prompt = " ".join("".join(rng.choice("abc") for _ in range(rng.randint(1, 3)))
+                          for _ in range(rng.randint(0, 12)))
+        live_diff = LiveDiff(prompt)
+        typed = ""
+        for _ in range(rng.randint(1, 60)):
+            action = rng.random()
+            if action < 0.5:
+                next_char = prompt[len(typed)] if len(typed) < len(prompt) else "a"
+                typed += next_char if rng.random() < 0.8 else rng.choice("abc d")
+            elif action < 0.7:
+                typed = typed[:-1]
+            elif action < 0.85:
+                index = rng.randint(0, len(typed))
+                typed = typed[:index] + rng.choice("abc d") + typed[index:]
+            elif typed:
+                index = rng.randrange(len(typed))
+                typed = typed[:index] + typed[index + 1:]
+            live_diff.update(typed)
+            expected = (score_words(prompt.split(), typed.split()),
+                        edit_distance(prompt, typed), _first_mismatch(prompt, typed))
+            found = (live_diff.word_score(), live_diff.char_score().distance,
+                     live_diff.first_error)
+            if found != expected:
+                failures.append((prompt, typed, f"{found}, expected {expected}"))
+                break
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check character scoring on random strings.")
+    parser.add_argument("--check", type=int, default=10000, metavar="N",
+                        help="number of random pairs and typing sessions (default: 10000)")
+    arguments = parser.parse_args()
+    problems = check_alignment(arguments.check)
+    for problem in problems[:10]:
+        print("Mismatch: prompt={!r} typed={!r}: {}".format(*problem))
+    print(f"{arguments.check - len(problems)}/{arguments.check} pairs match the reference.")
+    live_problems = check_live_diff(arguments.check)
+    for problem in live_problems[:10]:
+        print("Mismatch: prompt={!r} typed={!r}: {}".format(*problem))
+    print(f"{arguments.check - len(live_problems)}/{arguments.check} typing sessions "
+          "match scoring from scratch.")
+    sys.exit(1 if problems or live_problems else 0)
@@ -0,0 +1,244 @@
+"""
+Headless typing session engine, the Tk-free core of cpt_main.py.
+
+`TypingSession` owns every rule of a typing test: prompt selection by remaining
+time, the live diff of the typed buffer, per-entry scoring, the round's counters
+and accuracy percentages. Time comes from an injectable clock, so sessions can be
+simulated as fast as the CPU allows, e.g. in benchmarks or on a server without a
+display.
+
+Variables:
+    EntryResult (namedtuple): Outcome of one submitted entry.
+
+Classes:
+    TypingSession: State and rules of one user's typing test.
+"""
+
+# Import Python libraries:
+import math
+import time
+from collections import namedtuple
+
+# Import project modules:
+from cpt_corpus import tier_for_seconds
+from cpt_keylog import KeyLog
+from cpt_prompts import PromptQueue
+from cpt_sampler import WeakWordSampler
+from cpt_scoring import LiveDiff, WordScore
+from cpt_stats import round_stats
+
+# Outcome of one submitted entry, `at` is in seconds since the round started:
+EntryResult = namedtuple("EntryResult",
+                         ["prompt", "typed", "correct", "word_score", "char_score", "at"])
+
+
+class TypingSession:
+    """
+    State and rules of one user's typing test.
+
+    The sampler and prompt queue outlive `reset()`, so prompts don't repeat
+    across rounds, and the words missed in one round weigh on the next. The
+    clock starts on the first keystroke or submission.
+
+    Attributes:
+        char_accuracy (int): Percentage of prompt characters typed correctly.
+        char_errors (int): Character edit distance summed over the round's entries.
+        char_score (CharScore): Edit distance and character alignment of the last entry.
+        chars_total (int): Total number of prompt characters in the round.
+        clock (callable): Returns the current time in seconds.
+        corpus (CorpusLoader): Source of the tiers, see `cpt_corpus.py`.
+        current_prompt (Prompt): Prompt the user is currently typing.
+        duration (int): Length of a round in seconds.
+        entries (list): EntryResult of every entry submitted this round.
+        entry_accuracy (int): Percentage of entries typed exactly right.
+        keylog (KeyLog): Ring buffer of the round's keystrokes.
+        keystrokes (tuple): (deltas, keycodes, flags) arrays of the finished round, else None.
+        live_diff (LiveDiff): Match state of the typed buffer against current_prompt.
+        num_entries (int): Number of entries submitted this round.
+        prompts (PromptQueue): Prompts drawn, tokenized and measured ahead of time.
+        sampler (PromptSampler): Prompt selection for this app session, told about every entry.
+        started_at (float): Clock time of the round's first input, None until then.
+        stats (RoundStats): WPM and CPM figures of the finished round, else None.
+        user_right (int): Number of entries typed exactly right.
+        user_wrong (int): Number of entries with at least one error.
+        word_accuracy (int): Percentage of prompt words typed correctly.
+        word_score (WordScore): Right, wrong, missing and extra words so far this round.
+    """
+
+    def __init__(self, corpus, seconds: int = 60, clock=time.monotonic, sampler=None):
+        """
+        Initialize `TypingSession()` object.
+
+        Args:
+            corpus (CorpusLoader): Source of the tiers.
+            seconds (int): Length of a round in seconds. Default is 60.
+            clock (callable): Returns the current time in seconds. Default is `time.monotonic`.
+            sampler (PromptSampler): Prompt selection. Default is a new `WeakWordSampler(corpus)`.
+        """
+        self.corpus = corpus
+        self.duration = seconds
+        self.clock = clock
+        self.sampler = sampler or WeakWordSampler(corpus)
+        self.prompts = PromptQueue(self.sampler)
+        self.live_diff = LiveDiff()
+        self.keylog = KeyLog()
+        self.reset()
+
+    def reset(self):
+        """
+        Starts a new round with a fresh first-tier prompt and zeroed counters.
+        """
+        self.sampler.update()
+        self.started_at = None
+        self.entries = []
+        self.stats = None
+        self.num_entries = 0
+        self.user_right = 0
+        self.user_wrong = 0
+        self.word_score = WordScore(0, 0, 0, 0)
+        self.char_score = None
+        self.chars_total = 0
+        self.char_errors = 0
+        self.entry_accuracy = 0
+        self.word_accuracy = 0
+        self.char_accuracy = 0
+        self.keylog.clear()
+        self.keystrokes = None
+        self.next_prompt(self.corpus.first)
+
+    @property
+    def words_right(self) -> int:
+        """
+        Number of prompt words typed correctly this round.
+        """
+        return self.word_score.right
+
+    @property
+    def total_words(self) -> int:
+        """
+        Number of prompt words scored this round.
+        """
+        return self.word_score.total
+
+    def start(self):
+        """
+        Starts the clock, if it isn't running already.
+        """
+        if self.started_at is None:
+            self.started_at = self.clock()
+
+    def elapsed(self) -> float:
+        """
+        Seconds since the round started, at most its duration.
+        """
+        if self.started_at is None:
+            return 0.0
+        return min(self.clock() - self.started_at, self.duration)
+
+    def remaining(self) -> float:
+        """
+        Seconds left in the round.
+        """
+        return self.duration - self.elapsed()
+
+    def seconds_left(self) -> int:
+        """
+        Seconds left in the round, rounded up as shown on the countdown.
+        """
+        return math.ceil(self.remaining())
+
+    def is_over(self) -> bool:
+        """
+        True once the round has run for its full duration.
+        """
+        return self.started_at is not None and self.remaining() <= 0
+
+    def tier(self) -> str:
+        """
+        Name of the tier prompts are drawn from at the current remaining time.
+        """
+        return tier_for_seconds(self.seconds_left())
+
+    def next_prompt(self, tier: str = None):
+        """
+        Makes the next prepared prompt current.
+
+        Args:
+            tier (str): Tier to draw from. Default is None, the tier for the remaining time.
+
+        Returns:
+            Prompt: The new current prompt.
+        """
+        self.current_prompt = self.prompts.pop(tier or self.tier())
+        self.live_diff.reset(self.current_prompt.text, self.current_prompt.words)
+        return self.current_prompt
+
+    def update_typed(self, typed: str):
+        """
+        Diffs the typed buffer after a keystroke and starts the clock.
+
+        Args:
+            typed (str): Whole contents of the typing field.
+
+        Returns:
+            int or None: Index of the first error, None if there is none.
+        """
+        self.start()
+        return self.live_diff.update(typed)
+
+    def submit(self, typed: str) -> EntryResult:
+        """
+        Scores an entry against the current prompt and adds it to the round.
+
+        The current prompt is left in place; call `next_prompt()` to move on.
+
+        Args:
+            typed (str): Whole contents of the typing field.
+
+        Returns:
+            EntryResult: The entry's correctness and scores.
+        """
+        self.start()
+        if self.live_diff.typed != typed:
+            self.live_diff.update(typed)
+
+        word_score = self.live_diff.word_score()
+        self.sampler.record(self.live_diff.prompt_words, typed.split())
+        self.word_score += word_score
+        self.char_score = self.live_diff.char_score()
+        self.chars_total += self.char_score.length
+        self.char_errors += self.char_score.errors
+
+        correct = self.char_score.distance == 0
+        if correct:
+            self.user_right += 1
+        else:
+            self.user_wrong += 1
+        self.num_entries += 1
+        result = EntryResult(self.current_prompt.text, typed, correct,
+                             word_score, self.char_score, self.elapsed())
+        self.entries.append(result)
+        return result
+
+    def calculate_accuracy(self):
+        """
+        Sets entry_accuracy, word_accuracy and char_accuracy from the round's counters.
+        """
+        if self.user_right == 0:
+            self.entry_accuracy = 0
+        else:
+            self.entry_accuracy = round(self.user_right / self.num_entries * 100)
+        self.word_accuracy = self.word_score.accuracy()
+        if self.chars_total == 0:
+            self.char_accuracy = 0
+        else:
+            correct_chars = self.chars_total - self.char_errors
+            self.char_accuracy = round(correct_chars / self.chars_total * 100)
+
+    def finish(self):
+        """
+        Closes the round: calculates accuracy and speed, and snapshots the keystroke log.
+        """
+        self.calculate_accuracy()
+        self.stats = round_stats(self.entries, self.elapsed())
+        self.keystrokes = self.keylog.snapshot()
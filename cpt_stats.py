@@ -0,0 +1,71 @@
+"""
+Typing speed statistics for use in the Tkinter GUI via cpt_main.py.
+
+Speeds are computed from the elapsed time actually measured on the session's
+monotonic clock, with the standard normalization of 5 characters per word, so
+rounds of any length can be compared.
+
+Variables:
+    CHARS_PER_WORD (int - constant): Characters counted as one word.
+    RoundStats (namedtuple): Speed figures of one round.
+
+Functions:
+    round_stats(entries, elapsed): Speed figures of a round's entries.
+"""
+
+# Import Python libraries:
+import math
+from collections import namedtuple
+
+# Standard word length for WPM:
+CHARS_PER_WORD = 5
+
+# Speed figures of one round. `wpm_series` holds the cumulative gross WPM at the
+# end of each whole second:
+RoundStats = namedtuple("RoundStats", ["elapsed", "gross_wpm", "net_wpm", "cpm", "wpm_series"])
+
+
+def _typed_chars(entry) -> int:
+    """
+    Private function.
+    Characters typed for an entry, counting 'Enter' as the space between entries.
+    """
+    return len(entry.typed) + 1
+
+
+def round_stats(entries, elapsed: float) -> RoundStats:
+    """
+    Speed figures of a round's entries.
+
+    Gross WPM counts every typed character. Net WPM subtracts one word per minute
+    for every uncorrected character error, i.e. the entries' summed edit distance.
+    CPM counts typed characters less those errors.
+
+    Args:
+        entries (list of EntryResult): Submitted entries, in order, see `cpt_session.py`.
+        elapsed (float): Seconds the round actually lasted.
+
+    Returns:
+        RoundStats: The figures, all zero if no time has elapsed.
+    """
+    if elapsed <= 0:
+        return RoundStats(0.0, 0.0, 0.0, 0.0, [])
+    minutes = elapsed / 60
+
+    typed_chars = sum(_typed_chars(entry) for entry in entries)
+    errors = sum(entry.char_score.distance for entry in entries)
+    gross_wpm = typed_chars / CHARS_PER_WORD / minutes
+    net_wpm = max(0.0, gross_wpm - errors / minutes)
+    cpm = max(0, typed_chars - errors) / minutes
+
+    # Cumulative gross WPM at the end of each whole second:
+    wpm_series = []
+    chars_so_far = 0
+    position = 0
+    for second in range(1, math.ceil(elapsed) + 1):
+        while position < len(entries) and entries[position].at <= second:
+            chars_so_far += _typed_chars(entries[position])
+            position += 1
+        wpm_series.append(chars_so_far / CHARS_PER_WORD / (min(second, elapsed) / 60))
+
+    return RoundStats(elapsed, gross_wpm, net_wpm, cpm, wpm_series)
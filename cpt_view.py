@@ -0,0 +1,94 @@
+"""
+Render-diff view state for use in the Tkinter GUI via cpt_main.py.
+
+Every `configure()` on a Tk widget is a Tcl command, and over remote X most of
+them cost a network round trip, even when the value sent is the one already
+shown. `ViewState` remembers the options it last rendered on each widget and
+only sends the options that actually changed. Updates made during one turn of
+the event loop are merged per widget and sent together from a single
+`after_idle` callback, so a value overwritten within the turn, e.g. the last
+countdown digits replaced by "--", is never sent at all.
+
+Classes:
+    ViewState: Last rendered widget options, sending only real changes.
+"""
+
+
+class ViewState:
+    """
+    Last rendered widget options, sending only real changes.
+
+    Only options set through the view are tracked, so widgets it manages should
+    not be reconfigured directly. The first time an option is set it is always
+    sent.
+
+    Attributes:
+        root (Tk): Tkinter window whose `after_idle()` schedules the flushes.
+        sent (int): Configure calls sent to Tk.
+        skipped (int): Widget updates dropped because nothing had changed.
+    """
+
+    def __init__(self, root):
+        """
+        Initialize `ViewState()` object.
+
+        Args:
+            root (Tk): Tkinter window whose `after_idle()` schedules the flushes.
+        """
+        self.root = root
+        self.sent = 0
+        self.skipped = 0
+        self._rendered = {}
+        self._pending = {}
+        self._scheduled = False
+
+    def set(self, widget, **options):
+        """
+        Queues widget options to be rendered when Tk is next idle.
+
+        Args:
+            widget (Widget): A Tkinter widget.
+            **options: Options as passed to `widget.configure()`.
+        """
+        self._pending.setdefault(widget, {}).update(options)
+        if not self._scheduled:
+            self._scheduled = True
+            self.root.after_idle(self.flush)
+
+    def apply(self, widget, **options):
+        """
+        Renders widget options now, with any queued for the same widget.
+
+        For state the user's next event depends on, e.g. enabling an Entry.
+
+        Args:
+            widget (Widget): A Tkinter widget.
+            **options: Options as passed to `widget.configure()`.
+        """
+        pending = self._pending.pop(widget, {})
+        pending.update(options)
+        self._render(widget, pending)
+
+    def flush(self):
+        """
+        Renders every queued change. Scheduled automatically by `set()`.
+        """
+        self._scheduled = False
+        pending, self._pending = self._pending, {}
+        for widget, options in pending.items():
+            self._render(widget, options)
+
+    def _render(self, widget, options: dict):
+        """
+        Private method.
+        Sends the options that differ from the last rendered ones, in one configure call.
+        """
+        rendered = self._rendered.setdefault(widget, {})
+        changed = {name: value for name, value in options.items()
+                   if name not in rendered or rendered[name] != value}
+        if changed:
+            widget.configure(**changed)
+            rendered.update(changed)
+            self.sent += 1
+        else:
+            self.skipped += 1
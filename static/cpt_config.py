@@ -6,6 +6,7 @@ Variables:
     help_text (str): Content for help popup
     COLOR_MAP (str - constant): Color map for determining countdown display color
     COLORS (str - constant): Color dict for retrieval of hex codes
+    TIER_THRESHOLDS (dict - constant): Word bank used above each remaining second count
 
 Supplemental data/strings for use in the Tkinter GUI via cpt_main.py.
 """
@@ -31,6 +32,9 @@ Click 'Go again', 'Exit', or do absolutely nothing."""
 # Color map for determining countdown display color:
 COLOR_MAP = {5: "RED", 10: "ORANGE", 25: "YELLOW", 40: "BLUE", 60: "GREEN"}
 
+# Word bank used while the countdown is above each second count, in order:
+TIER_THRESHOLDS = {"long_sentences": 40, "short_sentences": 25, "words_two": 10, "words_one": -1}
+
 # Color dict for retrieval of hex codes:
 COLORS = {'RED': '#ec3e40',
           'ORANGE': '#ff9b2b',